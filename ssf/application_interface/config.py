@@ -23,9 +23,9 @@ class PackageDescription:
     tag: str = None
     base_image: str = None
     docker_run: str = ""
-    inclusions: List[str] = field(default_factory=lambda: [])
-    exclusions: List[str] = field(default_factory=lambda: [])
-    docker: Dict[str, str] = field(default_factory=lambda: {})
+    inclusions: List[str] = field(default_factory=list)
+    exclusions: List[str] = field(default_factory=list)
+    docker: Dict[str, str] = field(default_factory=dict)
 
 
 @dataclass
@@ -38,8 +38,8 @@ class EndpointDescription:
     custom: str = None
     generate: bool = True
     http_param_format: str = None
-    inputs: List[EndpointParam] = field(default_factory=lambda: [])
-    outputs: List[EndpointParam] = field(default_factory=lambda: [])
+    inputs: List[EndpointParam] = field(default_factory=list)
+    outputs: List[EndpointParam] = field(default_factory=list)
 
 
 @dataclass
@@ -57,7 +57,7 @@ class ApplicationDescription:
     # Application file is the location of the application module
     file: str = None
     file_dir: str = None
-    syspaths: List[str] = field(default_factory=lambda: [])
+    syspaths: List[str] = field(default_factory=list)
     # IPUs required for running one instance of application
     ipus: int = 1
     # IPUs required for running application including any type of replication
@@ -66,8 +66,8 @@ class ApplicationDescription:
     max_batch_size: int = 1
     package: PackageDescription = None
     interface = None
-    dependencies: Dict[str, str] = field(default_factory=lambda: {})
-    artifacts: List[str] = field(default_factory=lambda: [])
+    dependencies: Dict[str, str] = field(default_factory=dict)
+    artifacts: List[str] = field(default_factory=list)
     startup_timeout: int = 600
 
 
@@ -76,7 +76,7 @@ class SSFConfig:
     ssf_version: str = "0.0.1"
     config_file: str = None
     config_dict: dict = None
-    endpoints: List[EndpointDescription] = field(default_factory=lambda: [])
+    endpoints: List[EndpointDescription] = field(default_factory=list)
     application: ApplicationDescription = None
     args: Namespace = None
     unknown_args: List[str] = None
@@ -20,6 +20,11 @@ else:
 HEADER_METRICS_REQUEST_LATENCY: Final[str] = "metrics-request-latency"
 HEADER_METRICS_DISPATCH_LATENCY: Final[str] = "metrics-dispatch-latency"
 
+# Sent by a replica worker on the output queue (in place of a thread id)
+# once it is ready and after its first successful request.
+WORKER_READY: Final[str] = "worker-ready"
+WORKER_SUCCESS: Final[str] = "worker-success"
+
 # Prometheus
 PROMETHEUS_BUCKETS = [
     0.01,
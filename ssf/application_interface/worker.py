@@ -51,7 +51,6 @@ def process_loop(
     ssf_config: SSFConfig,
     settings: Settings,
     parent_pid: int,
-    process_failure_counts: list,
     input_queue: multiprocessing.Queue,
     output_queue: multiprocessing.Queue,
     ready: multiprocessing.Event,
@@ -90,6 +89,7 @@ def process_loop(
 
             healthy = True
             ready.set()
+            output_queue.put((WORKER_READY, index))
             last_ready_watchdog = None
 
             def reset_watchdog_ready_period():
@@ -99,8 +99,12 @@ def process_loop(
 
             reset_watchdog_ready_period()
 
+            # The first successful request is reported to the dispatcher.
+            reported_success = False
+
             batching_start, batched_params, batched_meta = (None, [], [])
             max_batch_size = ssf_config.application.max_batch_size
+            batched = max_batch_size > 1
             # Service the request (queue).
             logger.debug(f"[{index}] Dispatcher queue processing begin")
             logger.debug(
@@ -137,62 +141,82 @@ def process_loop(
                                 )
 
                         # NOTE:
-                        # This uses a timeout after 1 second so we can gracefully check for termination.
-                        # We need to check that this doesn't add measurable latency for the scenario
-                        # where we have intermittent requests.
-                        thread_id, inputs = input_queue.get(timeout=1)
+                        # Wait until a request arrives, the batching window closes
+                        # or the next watchdog poll is due. On termination, the
+                        # dispatcher queues a None request for each replica.
+                        timeout = None
+                        if batching_start:
+                            timeout = batching_start + settings.batching_timeout - now
+                        if last_ready_watchdog is not None:
+                            watchdog_due = (
+                                last_ready_watchdog + settings.watchdog_ready_period
+                            )
+                            if timeout is None or watchdog_due - now < timeout:
+                                timeout = watchdog_due - now
+                        request = input_queue.get(
+                            timeout=None if timeout is None else max(timeout, 0)
+                        )
+                        while request is not None:
+                            thread_id, inputs = request
+                            params, meta = inputs[:2]
+                            meta["replica"] = index
+
+                            batched_params.append(params)
+                            batched_meta.append(meta)
+                            thread_ids.append(thread_id)
+                            if len(batched_params) == max_batch_size:
+                                break
+                            # Add requests that are already queued without waiting.
+                            try:
+                                request = input_queue.get_nowait()
+                            except QueueEmpty:
+                                break
+                        if request is None:
+                            break
                         batching_start = (
                             time.time() if not batching_start else batching_start
                         )
-                        params, meta = inputs[:2]
-                        meta["replica"] = index
 
-                        batched_params.append(params)
-                        batched_meta.append(meta)
-                        thread_ids.append(thread_id)
+                    if not batched_params:
+                        # Terminated while waiting.
+                        continue
 
                     logger.debug(
                         f"[{index}] Dispatcher issuing request with params={batched_params} meta={batched_meta}"
                     )
 
                     chrono_start = time.time()
-                    input = (
-                        (batched_params, batched_meta)
-                        if max_batch_size > 1
-                        else (batched_params[0], batched_meta[0])
-                    )
-                    results = instance.request(*input)
+                    if batched:
+                        results = instance.request(batched_params, batched_meta)
+                    else:
+                        results = instance.request(batched_params[0], batched_meta[0])
                     chrono = time.time() - chrono_start
 
-                    if max_batch_size > 1:
+                    if batched:
                         if not isinstance(results, list) or not all(
                             isinstance(r, dict) for r in results
                         ):
                             raise SSFExceptionApplicationError(
                                 f"[{index}] Expected result as list of dict for batched request (size {max_batch_size})"
                             )
+                        # make sure every thread gets reply even if error
+                        results += [{}] * (len(thread_ids) - len(results))
                     else:
                         if not isinstance(results, dict):
                             raise SSFExceptionApplicationError(
                                 f"[{index}] Expected result as dict for unbatched request"
                             )
+                        results = (results,)
 
-                    if not isinstance(results, list):
-                        results = [results if results != None else {}]
-
-                    # make sure every thread gets reply even if error
-                    results += [{}] * (max_batch_size - len(results))
-
-                    for r in [i for i in zip(thread_ids, results)]:
+                    for r in zip(thread_ids, results):
                         r[1][HEADER_METRICS_DISPATCH_LATENCY] = chrono
                         output_queue.put(r)
 
-                    batching_start, batched_params, batched_meta, thread_ids = (
-                        None,
-                        [],
-                        [],
-                        [],
-                    )
+                    # NOTE:
+                    # The batch lists are handed over to the application (which
+                    # may keep them) so new ones are made; thread_ids is ours.
+                    batching_start, batched_params, batched_meta = (None, [], [])
+                    thread_ids.clear()
 
                     if settings.watchdog_request_threshold:
                         call_duration.append(chrono)
@@ -206,9 +230,11 @@ def process_loop(
                         break
 
                     # A successful request =>
-                    # - reset the failure loop detection
+                    # - reset the failure loop detection (in the dispatcher)
                     # - reset period until next watchdog ready poll
-                    process_failure_counts[index] = 0
+                    if not reported_success:
+                        output_queue.put((WORKER_SUCCESS, index))
+                        reported_success = True
                     reset_watchdog_ready_period()
 
                 except QueueEmpty:
@@ -219,10 +245,7 @@ def process_loop(
 
     except Exception as e:
         logger.exception(e)
-        process_failure_counts[index] += 1
-        logger.info(
-            f"[{index}] Application instance failure counts: {process_failure_counts}"
-        )
+        logger.info(f"[{index}] Application instance failure")
         for t_id in thread_ids:
             output_queue.put((t_id, None))
         if isinstance(e, SSFException):
@@ -231,9 +254,6 @@ def process_loop(
             exit_code = RESULT_APPLICATION_ERROR
 
     try:
-        if process_failure_counts:
-            logger.info(f"[{index}] Failure count {process_failure_counts}")
-
         logger.debug(f"[{index}] Dispatcher queue processing end")
         ready.clear()
 
@@ -279,7 +299,7 @@ def just_build_app(ssf_config, log_queue, parent_pid):
         sys.exit(e.result_code)
 
 
-def make_worker_manager(port, address, auth_key, index):
+def make_worker_manager(port, address, auth_key):
     port = int(port)
     manager = ReplicaManager(address=(address, port), authkey=auth_key)
     manager.register("input_queue")
@@ -287,9 +307,7 @@ def make_worker_manager(port, address, auth_key, index):
     manager.register("log_queue")
     manager.register("ready")
     manager.register("terminate")
-    manager.register("failure_count")
     manager.register("config")
-    manager.register(f"ready_{index}")
     manager.connect()
     return manager
 
@@ -306,32 +324,34 @@ def make_minimal_manager(port, address, auth_key):
 if __name__ == "__main__":
 
     assert (
-        len(sys.argv) == 3
-    ), "Error: worker only supports 2 arguments (replica_index, port)"
+        len(sys.argv) == 4
+    ), "Error: worker only supports 3 arguments (replica_index, port, namespace)"
     index = int(sys.argv[1])
     port = int(sys.argv[2])
+    namespace = sys.argv[3]
 
     if index >= 0:
         # start an actual worker
-        manager = make_worker_manager(int(port), "localhost", b"ssf", index)
+        manager = make_worker_manager(int(port), "localhost", b"ssf")
+        config = manager.config(namespace)
         process_loop(
-            ssf_config=manager.config().get("ssf_config"),
-            settings=manager.config().get("settings"),
-            parent_pid=manager.config().get("server_pid"),
-            process_failure_counts=manager.failure_count(),
-            input_queue=manager.input_queue(),
-            output_queue=manager.output_queue(),
-            ready=manager.__getattribute__(f"ready_{index}")(),
-            terminate=manager.terminate(),
+            ssf_config=config.get("ssf_config"),
+            settings=config.get("settings"),
+            parent_pid=config.get("server_pid"),
+            input_queue=manager.input_queue(namespace),
+            output_queue=manager.output_queue(namespace),
+            ready=manager.ready(namespace, index),
+            terminate=manager.terminate(namespace),
             log_queue=manager.log_queue(),
             index=index,
         )
     else:
         # just run the build step
         manager = make_minimal_manager(port, "localhost", b"ssf")
+        config = manager.config(namespace)
         ret = just_build_app(
-            ssf_config=manager.config().get("ssf_config"),
+            ssf_config=config.get("ssf_config"),
             log_queue=manager.log_queue(),
-            parent_pid=manager.config().get("server_pid"),
+            parent_pid=config.get("server_pid"),
         )
         sys.exit(ret)
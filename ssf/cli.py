@@ -295,7 +295,7 @@ def run(cli_args: list):
     fastapi_op.add_argument(
         "--cors-allow-origin-regex",
         type=str,
-        default="http.*://(?:localhost|127\.0\.0\.1)(?::\d+)?",
+        default=r"http.*://(?:localhost|127\.0\.0\.1)(?::\d+)?",
         help="Allow origin regex when CORS middleware is enabled.",
     )
 
@@ -580,6 +580,14 @@ def run(cli_args: list):
         help="Gcore: The target address with which to launch the deployment.",
     )
 
+    deploy_opt.add_argument(
+        "--deploy-gcore-pull-through-cache",
+        type=str,
+        default=None,
+        help="Gcore: Optional pull-through registry cache (<host>:<port>) from which the target pulls the package image.\n"
+        "The image is pulled as <host>:<port>/<package tag> and falls back to pulling the package tag directly if this fails.",
+    )
+
     deploy_opt.add_argument(
         "--deploy-paperspace-registry",
         type=str,
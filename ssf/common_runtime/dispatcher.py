@@ -2,36 +2,49 @@
 import logging
 import multiprocessing as mp
 import subprocess
-from socket import socket
-from multiprocessing.managers import ListProxy
 import os
 import threading
 import time
 from dataclasses import dataclass, field
 from threading import Thread
 from typing import Dict, List, Union
-from functools import partial
+from itertools import count
 
 from ssf.application_interface.config import SSFConfig
 from ssf.application_interface.results import *
-from ssf.application_interface.logger import get_log_queue
-from ssf.application_interface.runtime_settings import Settings
+from ssf.application_interface.runtime_settings import (
+    Settings,
+    WORKER_READY,
+    WORKER_SUCCESS,
+)
 
-from ssf.utils import ReplicaManager
+from ssf.common_runtime.manager import get_global_manager
 from ssf.sdk_utils import maybe_activate_poplar_sdk
 from ssf.common_runtime.common import *
 
+logger = logging.getLogger("ssf")
+
 
 class WorkerProcess:
     """Class to manage a single worker process"""
 
-    def __init__(self, index: int, port: int, executable: str, env):
+    def __init__(
+        self,
+        index: int,
+        port: int,
+        namespace: str,
+        executable: str,
+        env,
+        on_exit: callable = None,
+    ):
         self.index = index
         self.port = port
+        self.namespace = namespace
         self.executable = executable
         self.process = None
         self.pid = None
         self.env = env
+        self.on_exit = on_exit
 
     def start(self):
         this_path = os.path.dirname(os.path.abspath(__file__))
@@ -40,9 +53,22 @@ class WorkerProcess:
         )
 
         self.process = subprocess.Popen(
-            [self.executable, worker_pth, str(self.index), str(self.port)], env=self.env
+            [
+                self.executable,
+                worker_pth,
+                str(self.index),
+                str(self.port),
+                self.namespace,
+            ],
+            env=self.env,
         )
         self.pid = self.process.pid
+        if self.on_exit:
+            Thread(target=self.wait_exit, daemon=True).start()
+
+    def wait_exit(self):
+        self.process.wait()
+        self.on_exit()
 
     def is_alive(self):
         return self.process.poll() is None
@@ -58,9 +84,16 @@ class WorkerProcess:
         pass
 
 
-# Global function to make "frozen" picklable callables
-def get_attr(obj):
-    return obj
+class PendingResult:
+    """A result awaited by a single request thread"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+# Unique dispatcher index used to namespace global manager resources
+_dispatcher_ids = count()
 
 
 @dataclass
@@ -71,7 +104,6 @@ class Dispatcher:
     application_id: str
     ssf_config: SSFConfig
     max_restart_reached: bool = False
-    missing = {}
 
     def __post_init__(self):
         self.env = maybe_activate_poplar_sdk(self.ssf_config)
@@ -81,73 +113,60 @@ class Dispatcher:
         self.processes: List[Union(WorkerProcess, None)] = [
             None
         ] * self.settings.replicate_application
-        # SyncManager for replica workers communication
-        with socket() as s:
-            # Get a free port from OS
-            s.bind(("", 0))
-            self.port = s.getsockname()[1]
-            self.manager = ReplicaManager(
-                address=("localhost", int(self.port)), authkey=b"ssf"
-            )
-        self.manager.register("input_queue", callable=partial(get_attr, mp.Queue()))
-        self.manager.register("output_queue", callable=partial(get_attr, mp.Queue()))
-        self.manager.register("log_queue", callable=partial(get_attr, get_log_queue()))
-        self.manager.register("terminate", callable=partial(get_attr, mp.Event()))
-        self.manager.register(
-            "failure_count",
-            callable=partial(get_attr, [0] * self.settings.replicate_application),
-            proxytype=ListProxy,
-        )
-        self.manager.register(
-            "config",
-            callable=partial(
-                get_attr,
-                {
-                    "ssf_config": self.ssf_config,
-                    "settings": self.settings,
-                    "server_pid": os.getpid(),
-                },
-            ),
+        # Replica workers communicate through the global resource manager.
+        # Resources for this dispatcher are kept in their own namespace.
+        self.manager = get_global_manager()
+        self.port = self.manager.address[1]
+        self.namespace = f"{self.application_id}.{next(_dispatcher_ids)}"
+        self.manager.config(self.namespace).update(
+            {
+                "ssf_config": self.ssf_config,
+                "settings": self.settings,
+                "server_pid": os.getpid(),
+            }
         )
-        for k in range(self.settings.replicate_application):
-            self.manager.register(f"ready_{k}", callable=partial(get_attr, mp.Event()))
-        self.manager.start()
-        logger = logging.getLogger("ssf")
-        logger.debug(f"Resource manager PID: {self.manager._process.ident}")
-
-    @property
-    def process_failure_counts(self) -> List[int]:
-        """A process failure_count is incremented after each consecutive failure of application process.
-        It is reset to 0 as soon as the application process is running successfully."""
-        return self.manager.failure_count()
+        # A process failure count is incremented after each consecutive failure
+        # of the application process (see clean()).
+        # It is reset to 0 as soon as the application process reports a
+        # successful request (see route_results()).
+        self.process_failure_counts: List[int] = [
+            0
+        ] * self.settings.replicate_application
+        # Set when a replica becomes ready or exits.
+        self.state_changed = threading.Event()
+        # Results are routed from the output queue to the waiting request
+        # threads (keyed by thread id) by a single results thread.
+        self.pending: Dict[int, PendingResult] = {}
+        self.pending_lock = threading.Lock()
+        self.results_thread = Thread(target=self.route_results, daemon=True)
+        self.results_thread.start()
 
     @property
     def ready(self) -> List[mp.Event]:
         """Each replica process is set "ready" (using mp.Event) after application startup() finishes"""
         return [
-            self.manager.__getattribute__(f"ready_{k}")()
+            self.manager.ready(self.namespace, k)
             for k in range(self.settings.replicate_application)
         ]
 
     @property
     def terminate(self) -> mp.Event:
         """Global switch to terminate all replica processes"""
-        return self.manager.terminate()
+        return self.manager.terminate(self.namespace)
 
     @property
     def input_queue(self) -> mp.Queue:
-        return self.manager.input_queue()
+        return self.manager.input_queue(self.namespace)
 
     @property
     def output_queue(self) -> mp.Queue:
-        return self.manager.output_queue()
+        return self.manager.output_queue(self.namespace)
 
     @property
     def log_queue(self) -> mp.Queue:
         return self.manager.log_queue()
 
     def start(self):
-        logger = logging.getLogger("ssf")
         logger.debug(f"Start dispatcher enter {self.process_failure_counts}")
         if self.log_queue is None:
             raise SSFExceptionInternalError("Error loading the logger")
@@ -188,8 +207,10 @@ class Dispatcher:
                 new_processes[idx] = WorkerProcess(
                     idx,
                     self.port,
+                    self.namespace,
                     os.path.join(self.ssf_config.application.venv_dir, "bin/python"),
                     self.env,
+                    on_exit=self.state_changed.set,
                 )
                 logger.info(
                     f"Starting {self.application_id} replica idx {idx} (process failure count {self.process_failure_counts[idx]})"
@@ -211,55 +232,75 @@ class Dispatcher:
         logger.debug("Start dispatcher exit")
 
     def stop(self):
-        logger = logging.getLogger("ssf")
         logger.debug("Stop dispatcher enter")
         [ready.clear() for ready in self.ready]
         self.terminate.set()
+        # Wake up replicas waiting for a request.
+        [self.input_queue.put(None) for p in self.processes if p is not None]
         [p.join() for p in self.processes if p is not None]
         [p.close() for p in self.processes if p is not None]
         self.processes = [None] * len(self.processes)
+        # Wake up and stop the results thread.
+        self.output_queue.put(None)
+        self.results_thread.join()
+        # Drop this dispatcher's resources (the global manager keeps running).
+        self.manager.release(self.namespace)
         logger.debug(f"Stop dispatcher exit")
 
     def clean(self):
         # return True if all processes are alive
         # remove them otherwise
-        logger = logging.getLogger("ssf")
         status = False
         for idx, p in enumerate(self.processes):
             if p and not p.is_alive():
                 logger.error(
                     f"{self.application_id}:{idx} ({p.pid}) is not alive (exitcode {p.exitcode})."
                 )
+                # Processes seen here died unexpectedly: count any error exit,
+                # including signals (negative exit code, e.g. SIGKILL/SIGSEGV).
+                if p.exitcode != 0:
+                    self.process_failure_counts[idx] += 1
                 self.processes[idx].close()
                 self.processes[idx] = None
                 status = True
         return status
 
+    def pending_result(self, thread_id: int) -> PendingResult:
+        with self.pending_lock:
+            pending = self.pending.get(thread_id)
+            if pending is None:
+                pending = self.pending[thread_id] = PendingResult()
+            return pending
+
+    def route_results(self):
+        # Blocking read of the output queue; wake up the thread owning each result.
+        output_queue = self.output_queue
+        while True:
+            result = output_queue.get()
+            if result is None:
+                break
+            if result[0] == WORKER_READY:
+                self.state_changed.set()
+                continue
+            if result[0] == WORKER_SUCCESS:
+                self.process_failure_counts[result[1]] = 0
+                continue
+            pending = self.pending_result(result[0])
+            pending.result = result[1]
+            pending.event.set()
+
     def queue_request(self, data_dict: Dict):
         thread_id = threading.get_ident()
+        self.pending_result(thread_id)
         self.input_queue.put([thread_id, data_dict])
 
     def get_result(self):
-        result = None
-        while True:
-            if str(threading.get_ident()) in self.missing:
-                result = self.missing[str(threading.get_ident())]
-                del self.missing[str(threading.get_ident())]
-                break
-            else:
-                pass
-            try:
-                result = self.output_queue.get(timeout=0.001)
-                if result[0] != threading.get_ident():
-                    # Handle synchronisation issues
-                    # If the message was not for this thread
-                    # Put the message in a dict so the other threads can find it in quicker time
-                    self.missing[str(result[0])] = result
-                else:
-                    break
-            except:
-                pass
-        return result[1]
+        thread_id = threading.get_ident()
+        pending = self.pending_result(thread_id)
+        pending.event.wait()
+        with self.pending_lock:
+            del self.pending[thread_id]
+        return pending.result
 
     def queue_size(self):
         return self.input_queue.qsize()
@@ -269,27 +310,37 @@ class Dispatcher:
         # a replica process keep failing/restarting
         return not self.max_restart_reached
 
+    def _snapshot(self):
+        # Single pass over the replica processes.
+        # Returns (all_alive, all_ready, any_ready) where:
+        # - all_alive: all (non-stopped) replica processes are alive
+        # - all_ready: all replicas are started, alive and ready
+        # - any_ready: at least one replica is alive and ready
+        # Ready events are fetched once and only queried for live processes.
+        ready = self.ready
+        all_alive, all_ready, any_ready = True, True, False
+        for idx, p in enumerate(self.processes):
+            if p is None:
+                all_ready = False
+            elif not p.is_alive():
+                all_alive = all_ready = False
+            elif ready[idx].is_set():
+                any_ready = True
+            else:
+                all_ready = False
+        return all_alive, all_ready, any_ready
+
     def is_ready(self):
         # True if at least one replica is up and ready
-        for idx, p in enumerate(self.processes):
-            if p is not None and p.is_alive() and self.ready[idx].is_set():
-                return True
+        return self._snapshot()[2]
 
     def all_ready(self):
-        logger = logging.getLogger("ssf")
         # True if all replicas are up and ready
-        for idx, p in enumerate(self.processes):
-            if p is None:
-                return False
-            if not p.is_alive():
-                return False
-            if not self.ready[idx].is_set():
-                return False
-        return True
+        return self._snapshot()[1]
 
     def all_alive(self):
         # True if all replica processes are alive
-        return all(p.is_alive() for p in self.processes if p is not None)
+        return self._snapshot()[0]
 
     def exit_codes(self):
         # Returns list of exit codes for stopped processes
@@ -334,7 +385,6 @@ class Application:
     def watchdog(self):
         # Watchdog thread.
         # Restart dead workers
-        logger = logging.getLogger("ssf")
         logger.debug("Watchdog enter")
         while self.watchdog_period:
             if not self.check_dispatcher_health_ok():
@@ -344,7 +394,6 @@ class Application:
 
     def start(self):
         # Initiate and start dispatcher(s).
-        logger = logging.getLogger("ssf")
         logger.debug("Start enter")
         self.stopped = False
 
@@ -361,9 +410,14 @@ class Application:
         # Wait for workers to be ready for this application.
         # If a replica process fails to start,
         # just quit with an error
+        state_changed = self.dispatcher.state_changed
         while True:
-            time.sleep(1)
-            if not self.dispatcher.all_alive():
+            # Woken up as soon as a replica is ready or exits,
+            # time out to check for cancellation.
+            state_changed.wait(1)
+            state_changed.clear()
+            all_alive, all_ready, _ = self.dispatcher._snapshot()
+            if not all_alive:
                 logger.error(f"Dispatcher failed to start")
 
                 # Get set of unique exit codes from our dispatcher processes.
@@ -392,7 +446,7 @@ class Application:
                     )
                     break
 
-            if self.dispatcher.all_ready():
+            if all_ready:
                 logger.info("Dispatcher ready")
                 self.started = True
                 break
@@ -409,7 +463,6 @@ class Application:
         self.is_cancelled = True
 
         # Stop dispatcher(s).
-        logger = logging.getLogger("ssf")
 
         logger.debug("Stop enter")
 
@@ -0,0 +1,120 @@
+# Copyright (c) 2023 Graphcore Ltd. All rights reserved.
+import atexit
+import logging
+import multiprocessing as mp
+import threading
+from functools import partial
+from multiprocessing.managers import DictProxy, Server, listener_client
+from socket import socket, SOMAXCONN
+
+from ssf.application_interface.logger import get_log_queue
+from ssf.utils import ReplicaManager
+
+MANAGER_AUTHKEY = b"ssf"
+
+# NOTE:
+# The resource factories below are executed in the manager server process.
+# Resources are created on first access and namespaced so that a single
+# manager can serve any number of dispatchers (and the build step).
+_resources = {}
+_resources_lock = threading.Lock()
+
+
+def _get_resource(namespace: str, name: str, factory):
+    with _resources_lock:
+        key = (namespace, name)
+        if key not in _resources:
+            _resources[key] = factory()
+        return _resources[key]
+
+
+def _input_queue(namespace: str):
+    return _get_resource(namespace, "input_queue", mp.Queue)
+
+
+def _output_queue(namespace: str):
+    return _get_resource(namespace, "output_queue", mp.Queue)
+
+
+def _terminate(namespace: str):
+    return _get_resource(namespace, "terminate", mp.Event)
+
+
+def _ready(namespace: str, index: int):
+    return _get_resource(namespace, f"ready_{index}", mp.Event)
+
+
+def _config(namespace: str):
+    return _get_resource(namespace, "config", dict)
+
+
+def _release(namespace: str):
+    with _resources_lock:
+        for key in [k for k in _resources if k[0] == namespace]:
+            del _resources[key]
+
+
+# Global function to make "frozen" picklable callables
+def _get_attr(obj):
+    return obj
+
+
+class GlobalServer(Server):
+    """Manager server with a deeper accept queue.
+
+    The default manager server listens with a backlog of 16 connections.
+    Each replica worker opens several connections on startup (one per proxy)
+    so, with many replicas starting at once, connection attempts overflow
+    the accept queue and are delayed by TCP retries.
+    Accepting is cheap (authentication is done by the per-connection handler
+    thread) so a single accepter with a deeper queue is sufficient.
+    """
+
+    def __init__(self, registry, address, authkey, serializer):
+        super().__init__(registry, address, authkey, serializer)
+        # Re-open the listener on the same address with a deeper backlog.
+        Listener, _ = listener_client[serializer]
+        self.listener.close()
+        self.listener = Listener(address=self.address, backlog=SOMAXCONN)
+        self.address = self.listener.address
+
+
+class GlobalManager(ReplicaManager):
+    _Server = GlobalServer
+
+
+_global_manager = None
+_global_manager_lock = threading.Lock()
+
+
+def get_global_manager() -> GlobalManager:
+    """Returns the process-wide resource manager, starting it on first use.
+
+    Resources are accessed by namespace, e.g. `manager.input_queue(namespace)`.
+    The manager is shut down once, at exit.
+    """
+    global _global_manager
+    with _global_manager_lock:
+        if _global_manager is None:
+            logger = logging.getLogger("ssf")
+            with socket() as s:
+                # Get a free port from OS
+                s.bind(("", 0))
+                port = s.getsockname()[1]
+            manager = GlobalManager(
+                address=("localhost", int(port)), authkey=MANAGER_AUTHKEY
+            )
+            manager.register("input_queue", callable=_input_queue)
+            manager.register("output_queue", callable=_output_queue)
+            manager.register("terminate", callable=_terminate)
+            manager.register("ready", callable=_ready)
+            manager.register("config", callable=_config, proxytype=DictProxy)
+            manager.register("release", callable=_release)
+            # The log queue is owned by this process (read by the log listener)
+            # so it is shared as-is rather than created by the manager.
+            manager.register("log_queue", callable=partial(_get_attr, get_log_queue()))
+            manager.start()
+            atexit.register(manager.shutdown)
+            logger.debug(f"Resource manager PID: {manager._process.ident}")
+            _global_manager = manager
+    return _global_manager
@@ -1,4 +1,5 @@
 # Copyright (c) 2023 Graphcore Ltd. All rights reserved.
+from hashlib import sha256
 from secrets import compare_digest
 
 # This module provides a default implementation of a session
@@ -9,14 +10,21 @@ from secrets import compare_digest
 # this file or to specify your own custom implementation file.
 
 
+# Test user accounts, with passwords stored as SHA-256 digests.
+USERS = {
+    "test": {
+        "password_sha256": sha256(b"123456").digest(),
+        "uid": 1,
+    },
+}
+
+# Compared against when the user is unknown so that the time taken
+# does not reveal whether a username exists.
+UNKNOWN_USER_PASSWORD_SHA256 = sha256(b"").digest()
+
+
 def db_lookup_user(username: str):
-    users = {
-        "test": {
-            "password": "123456",
-            "uid": 1,
-        },
-    }
-    return users.get(username)
+    return USERS.get(username)
 
 
 def authenticate_user(username: str, password: str):
@@ -37,6 +45,10 @@ def authenticate_user(username: str, password: str):
             A unique "user id" as a string to permit access.
     """
     user_account = db_lookup_user(username)
-    if user_account and compare_digest(password, user_account["password"]):
+    candidate = sha256(password.encode("utf-8")).digest()
+    if user_account is None:
+        compare_digest(candidate, UNKNOWN_USER_PASSWORD_SHA256)
+        return None
+    if compare_digest(candidate, user_account["password_sha256"]):
         return str(user_account["uid"])
     return None
@@ -1,4 +1,5 @@
 # Copyright (c) 2023 Graphcore Ltd. All rights reserved.
+import importlib
 import logging
 import os
 from typing import List, Tuple
@@ -7,18 +8,79 @@ from ssf.application_interface.config import SSFConfig
 from ssf.application_interface.results import *
 
 from ssf.package import get_package_name_and_tag
-from ssf.deploy_paperspace import deploy as deploy_paperspace
-from ssf.deploy_gcore import deploy as deploy_gcore
 from ssf.version import SSF_DEPLOY_IMAGE
 
 logger = logging.getLogger("ssf")
 
-platforms = {
-    "Paperspace": deploy_paperspace,
-    "Gcore": deploy_gcore,
+# Deployment platform => module providing its deploy() function.
+# Platform modules are imported on use, only the selected one is loaded.
+PLATFORMS = {
+    "Paperspace": "ssf.deploy_paperspace",
+    "Gcore": "ssf.deploy_gcore",
 }
 
 
+# Arguments passed through to the container (when set), in order.
+CONTAINER_OPTIONS = [
+    "host",
+    "port",
+    "replicate_application",
+    "fastapi_replicate_server",
+    "grpc_max_connections",
+    "key",
+    "file_log_level",
+    "stdout_log_level",
+    "prometheus_disabled",
+    "prometheus_buckets",
+    "prometheus_endpoint",
+    "prometheus_port",
+]
+CONTAINER_RUNTIME_OPTIONS = [
+    "stop_on_error",
+    "watchdog_ready_period",
+]
+CONTAINER_OPTION_GROUPS = [
+    (
+        "enable_cors_middleware",
+        [
+            "cors_allow_origin_regex",
+            "cors_allow_credentials",
+            "cors_allow_methods",
+            "cors_allow_headers",
+            "cors_expose_headers",
+            "cors_max_age",
+        ],
+    ),
+    ("enable_ssl", ["ssl_certificate_file", "ssl_key_file"]),
+    (
+        "enable_session_authentication",
+        [
+            "session_authentication_timeout",
+            "session_authentication_module_file",
+        ],
+    ),
+]
+
+
+def container_options(args, names: List[str], always: bool = False) -> List[str]:
+    # Build "--<name> <value>" options for the named arguments.
+    # Switches (True) are passed as "--<name>" and lists as space separated values.
+    # Unset arguments are skipped unless always is specified.
+    options = []
+    for name in names:
+        value = getattr(args, name)
+        if not (value or always):
+            continue
+        flag = "--" + name.replace("_", "-")
+        if value is True:
+            options.append(flag)
+        elif isinstance(value, list):
+            options.append(f"{flag} {' '.join(str(v) for v in value)}")
+        else:
+            options.append(f"{flag} {value}")
+    return options
+
+
 def get_container_options(
     ssf_config: SSFConfig,
 ) -> Tuple[List[str], List[Tuple[str, str, str]], int]:
@@ -44,78 +106,18 @@ def get_container_options(
             # so subsequent code knows to avoid leaking in logs.
             add_env.append((key, os.getenv(key), "secret"))
 
-    if args.host:
-        ssf_options.append(f"--host {args.host}")
-
-    if args.port:
-        ssf_options.append(f"--port {args.port}")
-
-    if args.replicate_application:
-        ssf_options.append(f"--replicate-application {args.replicate_application}")
-
-    if args.fastapi_replicate_server:
-        ssf_options.append(
-            f"--fastapi-replicate-server {args.fastapi_replicate_server}"
-        )
-
-    if args.grpc_max_connections:
-        ssf_options.append(f"--grpc-max-connections {args.grpc_max_connections}")
-
-    if args.key:
-        ssf_options.append(f"--key {args.key}")
-
-    if args.file_log_level:
-        ssf_options.append(f"--file-log-level {args.file_log_level}")
-
-    if args.stdout_log_level:
-        ssf_options.append(f"--stdout-log-level {args.stdout_log_level}")
-
-    if args.prometheus_disabled:
-        ssf_options.append(f"--prometheus-disabled")
-
-    if args.prometheus_buckets:
-        ssf_options.append(
-            f"--prometheus-buckets {' '.join(str(b) for b in args.prometheus_buckets)}"
-        )
-
-    if args.prometheus_endpoint:
-        ssf_options.append(f"--prometheus-endpoint {args.prometheus_endpoint}")
-
-    if args.prometheus_port:
-        ssf_options.append(f"--prometheus-port {args.prometheus_port}")
+    ssf_options.extend(container_options(args, CONTAINER_OPTIONS))
 
     if not args.deploy_package:
         ssf_options.append(f"--config {args.config}")
         ssf_options.extend(["init", "build", "run"])
 
-    if args.stop_on_error:
-        ssf_options.append(f"--stop-on-error")
-
-    if args.watchdog_ready_period:
-        ssf_options.append(f"--watchdog-ready-period {args.watchdog_ready_period}")
-
-    if args.enable_cors_middleware:
-        ssf_options.append("--enable-cors-middleware")
-        ssf_options.append(f"--cors-allow-origin-regex {args.cors_allow_origin_regex}")
-        ssf_options.append(f"--cors-allow-credentials {args.cors_allow_credentials}")
-        ssf_options.append(f"--cors-allow-methods {args.cors_allow_methods}")
-        ssf_options.append(f"--cors-allow-headers {args.cors_allow_headers}")
-        ssf_options.append(f"--cors-expose-headers {args.cors_expose_headers}")
-        ssf_options.append(f"--cors-max-age {args.cors_max_age}")
-
-    if args.enable_ssl:
-        ssf_options.append("--enable-ssl")
-        ssf_options.append(f"--ssl-certificate-file {args.ssl_certificate_file}")
-        ssf_options.append(f"--ssl-key-file {args.ssl_key_file}")
-
-    if args.enable_session_authentication:
-        ssf_options.append("--enable-session-authentication")
-        ssf_options.append(
-            f"--session-authentication-timeout {args.session_authentication_timeout}"
-        )
-        ssf_options.append(
-            f"--session-authentication-module-file {args.session_authentication_module_file}"
-        )
+    ssf_options.extend(container_options(args, CONTAINER_RUNTIME_OPTIONS))
+
+    # Option groups are passed through (complete) when enabled.
+    for enable, group in CONTAINER_OPTION_GROUPS:
+        if getattr(args, enable):
+            ssf_options.extend(container_options(args, [enable] + group, always=True))
 
     if args.deploy_custom_args:
         ssf_options.append(args.deploy_custom_args)
@@ -126,14 +128,15 @@ def get_container_options(
 def deploy(ssf_config: SSFConfig):
     logger.info("> ==== Deploy ====")
 
-    platform = ssf_config.args.deploy_platform
+    args = ssf_config.args
+    platform = args.deploy_platform
 
-    if not platform in platforms:
+    if not platform in PLATFORMS:
         raise SSFExceptionDeploymentError(
-            f"Deployment platform {platform} is not supported (supported == {platform.keys()})"
+            f"Deployment platform {platform} is not supported (supported == {list(PLATFORMS)})"
         )
 
-    if ssf_config.args.deploy_package:
+    if args.deploy_package:
         _, package_tag = get_package_name_and_tag(ssf_config)
         logger.info(f"Deploy package : package_tag {package_tag}")
     else:
@@ -146,14 +149,15 @@ def deploy(ssf_config: SSFConfig):
 
     application_id = ssf_config.application.id
 
-    if ssf_config.args.deploy_name:
-        name = ssf_config.args.deploy_name
+    if args.deploy_name:
+        name = args.deploy_name
     else:
         name = application_id
 
     ssf_options, add_env, total_application_ipus = get_container_options(ssf_config)
 
-    return platforms[platform](
+    platform_deploy = importlib.import_module(PLATFORMS[platform]).deploy
+    return platform_deploy(
         ssf_config,
         application_id,
         package_tag,
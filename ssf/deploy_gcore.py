@@ -9,11 +9,19 @@ from ssf.application_interface.results import (
 )
 
 from ssf.publish import docker_login_command, docker_logout_command
-from ssf.ssh import add_ssh_host
-from ssf.utils import logged_subprocess
+from ssf.ssh import add_ssh_host, ssh_command
+from ssf.utils import logged_subprocess, write_file_atomic
 
 logger = logging.getLogger("ssf")
 
+# NOTE:
+# With --deploy-gcore-pull-through-cache, the boot script first pulls the package
+# image through a registry cache, so repeated deployments don't re-download layers.
+# A pull-through cache can be started (once) on the target with, for example:
+#   docker run -d --restart=always --name mirror -p 5000:5000 \
+#     -e REGISTRY_PROXY_REMOTEURL=https://registry-1.docker.io registry:2
+# and used with `--deploy-gcore-pull-through-cache localhost:5000`.
+
 
 def deploy(
     ssf_config: SSFConfig,
@@ -30,87 +38,101 @@ def deploy(
 
     deploy_gcore_target_address = args.deploy_gcore_target_address
     deploy_gcore_target_username = args.deploy_gcore_target_username
+    docker_login = bool(args.docker_username and args.docker_password)
 
     boot_file = f"{application_id}-boot.sh"
 
-    with open(boot_file, "w") as boot:
-
-        boot.write("#!/usr/bin/env bash\n")
-        config_cmd = ""
-        # Optional - Login docker before pulling image.
-        if args.docker_username and args.docker_password:
-            # NOTE:
-            # The docker password is referenced from an environement variable rather
-            # than baking it into the script; it must be set when the script is run.
-            boot.write('echo "Login docker repository:"\n')
-            _, cmd, pwd, config_path = docker_login_command(ssf_config)
-            boot.write('echo "$DOCKER_PASSWORD" | ' + " ".join(cmd) + "\n")
-            config_cmd = "--config" + " " + config_path
-
-        # Pull docker image package_tag.
-        boot.write(f'echo "Pulling {package_tag}:"\n')
-        boot.write(f"if ! docker {config_cmd} pull {package_tag}; then\n")
-        boot.write(f'  echo "ERROR: Failed to pull package image {package_tag}"\n')
-        boot.write("  exit 1\n")
-        boot.write("fi\n")
-
-        # Log out from Docker
-        if args.docker_username and args.docker_password:
-            boot.write(f'  echo "Logging out from Docker registry"\n')
-            _, logout_cmd = docker_logout_command(ssf_config)
-            boot.write(" ".join(logout_cmd) + "\n")
-            boot.write(f"rm -r {config_path}" + "\n")
-
-        # Stop/remove running container (if any)
-        boot.write(
-            f"if [ \"$( docker container inspect -f '{{{{.State.Status}}}}' {name} 2> /dev/null )\" ]; then\n"
-        )
-        boot.write(f'  echo "Stopping current {name} container:"\n')
-        boot.write(f"  docker rm -f {name}\n")
-        boot.write("fi\n")
-
-        # Run container.
+    # Build the complete boot script in memory.
+    boot = ["#!/usr/bin/env bash"]
+    config_cmd = ""
+    # Optional - Login docker before pulling image.
+    if docker_login:
         # NOTE:
-        # Each environment variables is referenced from the environement variable rather
+        # The docker password is referenced from an environement variable rather
         # than baking it into the script; it must be set when the script is run.
-        boot.write(f'echo "Running {name} container:"\n')
-        if total_application_ipus > 0:
-            docker_run = "gc-docker -- -d "
-        else:
-            docker_run = "docker run -d --network host"
-        boot.write(f"if ! {docker_run} \\\n")
-        for e in add_env:
-            boot.write(f'  --env {e[0]}="${{{e[0]}}}" \\\n')
-        options = "\\\n  ".join(ssf_options)
-        boot.write(f'  --env SSF_OPTIONS="{options}" \\\n')
-        boot.write(f"  --name {name} {package_tag}; then\n")
-        boot.write(f'  echo "ERROR: Failed to run package image {package_tag}"\n')
-        boot.write("  exit 2\n")
-        boot.write("fi\n")
-        boot.write("sleep 2\n")
-        boot.write('echo "Startup logs:"\n')
-        boot.write(f"docker logs {name}\n")
-        boot.write('echo "..."\n')
-        boot.write(f'docker inspect {name} --format="{{{{.State}}}}"\n')
-        boot.write(
-            f'RUNNING=$(docker inspect {name} --format="{{{{.State.Running}}}}")\n'
-        )
-        boot.write('echo "RUNNING:${RUNNING}"\n')
-        boot.write('if [ "${RUNNING}" == "true" ]; then\n')
-        boot.write(f'  echo "{name} is running"\n')
-        boot.write('  echo "Docker processes:"\n')
-        boot.write("  docker ps\n")
-        boot.write("  exit 0\n")
-        boot.write("else\n")
-        boot.write(f'  echo "ERROR: {name} is not running"\n')
-        boot.write("  exit 1\n")
-        boot.write("fi\n")
-
-    with open(boot_file, "r") as boot:
-        boot = boot.readlines()
-        for line in boot:
-            line = line.rstrip()
-            logger.debug("Boot script> " + line)
+        _, cmd, pwd, config_path = docker_login_command(ssf_config)
+        boot += [
+            'echo "Login docker repository:"',
+            'echo "$DOCKER_PASSWORD" | ' + " ".join(cmd),
+        ]
+        config_cmd = "--config" + " " + config_path
+
+    # Pull docker image package_tag.
+    boot.append(f'echo "Pulling {package_tag}:"')
+    pull_through_cache = args.deploy_gcore_pull_through_cache
+    if pull_through_cache:
+        # Try the cache first, then fall back to pulling package_tag directly.
+        cached_tag = f"{pull_through_cache}/{package_tag}"
+        boot += [
+            f"if docker pull {cached_tag} && docker tag {cached_tag} {package_tag}; then",
+            f'  echo "Pulled {package_tag} from {pull_through_cache}"',
+            f"elif ! docker {config_cmd} pull {package_tag}; then",
+        ]
+    else:
+        boot.append(f"if ! docker {config_cmd} pull {package_tag}; then")
+    boot += [
+        f'  echo "ERROR: Failed to pull package image {package_tag}"',
+        "  exit 1",
+        "fi",
+    ]
+
+    # Log out from Docker
+    if docker_login:
+        _, logout_cmd = docker_logout_command(ssf_config)
+        boot += [
+            f'  echo "Logging out from Docker registry"',
+            " ".join(logout_cmd),
+            f"rm -r {config_path}",
+        ]
+
+    # Stop/remove running container (if any)
+    boot += [
+        f"if [ \"$( docker container inspect -f '{{{{.State.Status}}}}' {name} 2> /dev/null )\" ]; then",
+        f'  echo "Stopping current {name} container:"',
+        f"  docker rm -f {name}",
+        "fi",
+    ]
+
+    # Run container.
+    # NOTE:
+    # Each environment variables is referenced from the environement variable rather
+    # than baking it into the script; it must be set when the script is run.
+    if total_application_ipus > 0:
+        docker_run = "gc-docker -- -d "
+    else:
+        docker_run = "docker run -d --network host"
+    boot += [f'echo "Running {name} container:"', f"if ! {docker_run} \\"]
+    boot += [f'  --env {e[0]}="${{{e[0]}}}" \\' for e in add_env]
+    options = "\\\n  ".join(ssf_options)
+    boot += [
+        f'  --env SSF_OPTIONS="{options}" \\',
+        f"  --name {name} {package_tag}; then",
+        f'  echo "ERROR: Failed to run package image {package_tag}"',
+        "  exit 2",
+        "fi",
+        "sleep 2",
+        'echo "Startup logs:"',
+        f"docker logs {name}",
+        'echo "..."',
+        f'docker inspect {name} --format="{{{{.State}}}}"',
+        f'RUNNING=$(docker inspect {name} --format="{{{{.State.Running}}}}")',
+        'echo "RUNNING:${RUNNING}"',
+        'if [ "${RUNNING}" == "true" ]; then',
+        f'  echo "{name} is running"',
+        '  echo "Docker processes:"',
+        "  docker ps",
+        "  exit 0",
+        "else",
+        f'  echo "ERROR: {name} is not running"',
+        "  exit 1",
+        "fi",
+    ]
+    boot = "\n".join(boot) + "\n"
+
+    # Write the boot script in one go and log it from memory.
+    write_file_atomic(boot_file, boot)
+    for line in boot.splitlines():
+        logger.debug("Boot script> " + line)
 
     if deploy_gcore_target_address:
         # ssh run it, passing through keys
@@ -125,19 +147,17 @@ def deploy(
         else:
             target = deploy_gcore_target_address
 
-        with open(boot_file, "r") as boot:
-            boot = boot.readlines()
-            cmds = ["ssh", f"{target}"]
-            # Pass through docker password and enviroment variables.
-            if args.docker_username and args.docker_password:
-                cmds.append(f'export DOCKER_PASSWORD="{args.docker_password}";')
-            for e in add_env:
-                cmds.append(f'export {e[0]}="{e[1]}";')
-            cmds.extend(["bash", "-s"]),
-
-            exit_code = logged_subprocess(
-                "Execute boot file", cmds, piped_input="".join(boot).encode()
-            )
+        cmds = ssh_command(target)
+        # Pass through docker password and enviroment variables.
+        if docker_login:
+            cmds.append(f'export DOCKER_PASSWORD="{args.docker_password}";')
+        for e in add_env:
+            cmds.append(f'export {e[0]}="{e[1]}";')
+        cmds.extend(["bash", "-s"]),
+
+        exit_code = logged_subprocess(
+            "Execute boot file", cmds, piped_input=boot.encode()
+        )
         if exit_code:
             raise SSFExceptionGcoreDeploymentError(
                 f"Execute boot file {boot_file} at {target} errored ({exit_code})"
@@ -1,9 +1,10 @@
 # Copyright (c) 2023 Graphcore Ltd. All rights reserved.
 import atexit
+import io
 import logging
 import os
-import tempfile
-from typing import List, Tuple
+import re
+from typing import Dict, List, Tuple
 import sys
 import shutil
 
@@ -13,17 +14,36 @@ from ssf.application_interface.results import (
     SSFExceptionPaperspaceDeploymentError,
 )
 
-from ssf.utils import logged_subprocess
+from ssf.utils import logged_subprocess, write_file_atomic
 
 logger = logging.getLogger("ssf")
 
 GRADIENT_VENV_DIR = ".gradient_venv"
+# Created once Gradient is successfully installed in GRADIENT_VENV_DIR.
+GRADIENT_INSTALLED_FILE = os.path.join(GRADIENT_VENV_DIR, ".gradient_installed")
+
+# Secret values in the generated spec are marked up so they can be masked in logs.
+MARKUP_SECRET_VALUE_BEGIN = "#SECRET VALUE BEGIN"
+MARKUP_SECRET_VALUE_END = "#SECRET VALUE END"
+MARKUP_SECRET_VALUE_RE = re.compile(
+    f"^{MARKUP_SECRET_VALUE_BEGIN}\n.*?\n{MARKUP_SECRET_VALUE_END}$",
+    re.MULTILINE | re.DOTALL,
+)
+
+# Environment with Gradient available (once prepared).
+gradient_environ = None
 
 
 def prepare_gradient_venv():
+    global gradient_environ
+    if gradient_environ is not None:
+        return gradient_environ
     environ = os.environ
-    environ["PATH"] = os.path.join(GRADIENT_VENV_DIR, "bin") + ":" + environ["PATH"]
-    if not os.path.isdir(GRADIENT_VENV_DIR):
+    gradient_bin = os.path.join(GRADIENT_VENV_DIR, "bin")
+    if not environ["PATH"].startswith(gradient_bin + ":"):
+        environ["PATH"] = gradient_bin + ":" + environ["PATH"]
+    result = 0
+    if not os.path.isfile(GRADIENT_INSTALLED_FILE):
         logger.info(
             "> One-time preparation of environment with Gradient for Paperspace deployment"
         )
@@ -33,16 +53,50 @@ def prepare_gradient_venv():
         )
         if result == 0:
             result = logged_subprocess(
-                "Install Gradient", ["pip3", "install", "gradient"], environ=environ
+                "Install Gradient",
+                [
+                    "pip3",
+                    "install",
+                    "--disable-pip-version-check",
+                    "--no-cache-dir",
+                    "--no-input",
+                    "--prefer-binary",
+                    "gradient",
+                ],
+                environ=environ,
             )
-        if result != 0:
+        if result == 0:
+            open(GRADIENT_INSTALLED_FILE, "w").close()
+        else:
             logger.error(
                 "Failed one-time preparation of environment with Gradient for Paperspace deployment"
             )
-            shutil.rmtree(GRADIENT_VENV_DIR)
+            shutil.rmtree(GRADIENT_VENV_DIR, ignore_errors=True)
+    if result == 0:
+        gradient_environ = environ
     return environ
 
 
+def parse_gradient_table(lines: List[str], key: str, value: str) -> Dict[str, str]:
+    """Parse a Gradient CLI table into a dict mapping column 'key' to column 'value'.
+    e.g.
+    +-------------+--------------------------------------+
+    | Name        | ID                                   |
+    +-------------+--------------------------------------+
+    | simple_test | 7c16c005-2de3-4e15-817d-de01bc117f74 |
+    +-------------+--------------------------------------+
+    """
+    rows = [
+        [cell.strip() for cell in line.strip().strip("|").split("|")]
+        for line in lines
+        if line.lstrip().startswith("|")
+    ]
+    if not rows or key not in rows[0] or value not in rows[0]:
+        return {}
+    k, v = rows[0].index(key), rows[0].index(value)
+    return {row[k]: row[v] for row in rows[1:] if len(row) > max(k, v)}
+
+
 def deploy(
     ssf_config: SSFConfig,
     application_id: str,
@@ -86,127 +140,119 @@ def deploy(
     environ = prepare_gradient_venv()
 
     def get_existing_instance_id():
-        with tempfile.NamedTemporaryFile(mode="w+t") as gradient_output:
-            try:
-                exit_code = logged_subprocess(
-                    "Gradient deployments list",
-                    [
-                        "gradient",
-                        "deployments",
-                        "list",
-                        "--name",
-                        name,
-                        "--projectId",
-                        project_id,
-                        "--clusterId",
-                        cluster_id,
-                        "--apiKey",
-                        api_key,
-                    ],
-                    file_output=gradient_output,
-                    environ=environ,
-                )
-            except Exception as e:
-                logger.exception(e)
-                return None
-
-            gradient_output.seek(0)
-            lines = gradient_output.readlines()
-            # +-------------+--------------------------------------+
-            # | Name        | ID                                   |
-            # +-------------+--------------------------------------+
-            # | simple_test | 7c16c005-2de3-4e15-817d-de01bc117f74 |
-            # +-------------+--------------------------------------+
-            logger.debug(lines)
-            try:
-                for line in lines:
-                    if name in line:
-                        instance = line.strip()
-                        instance = instance.split("|")
-                        return instance[2].strip()
-            except:
-                pass
-            logger.debug("Did not find existing deployment")
+        gradient_output = io.StringIO()
+        try:
+            exit_code = logged_subprocess(
+                "Gradient deployments list",
+                [
+                    "gradient",
+                    "deployments",
+                    "list",
+                    "--name",
+                    name,
+                    "--projectId",
+                    project_id,
+                    "--clusterId",
+                    cluster_id,
+                    "--apiKey",
+                    api_key,
+                ],
+                file_output=gradient_output,
+                environ=environ,
+            )
+        except Exception as e:
+            logger.exception(e)
             return None
 
+        lines = gradient_output.getvalue().splitlines()
+        # +-------------+--------------------------------------+
+        # | Name        | ID                                   |
+        # +-------------+--------------------------------------+
+        # | simple_test | 7c16c005-2de3-4e15-817d-de01bc117f74 |
+        # +-------------+--------------------------------------+
+        logger.debug(lines)
+        instance_id = parse_gradient_table(lines, "Name", "ID").get(name)
+        if instance_id:
+            return instance_id
+        logger.debug("Did not find existing deployment")
+        return None
+
     def create_deployment():
-        with tempfile.NamedTemporaryFile(mode="w+t") as gradient_output:
-            try:
-                exit_code = logged_subprocess(
-                    "Gradient deployments create",
-                    [
-                        "gradient",
-                        "deployments",
-                        "create",
-                        "--name",
-                        name,
-                        "--projectId",
-                        project_id,
-                        "--clusterId",
-                        cluster_id,
-                        "--apiKey",
-                        api_key,
-                        "--spec",
-                        spec_file,
-                    ],
-                    file_output=gradient_output,
-                    environ=environ,
-                )
-            except Exception as e:
-                logger.exception(e)
-                return None
-
-            gradient_output.seek(0)
-            lines = gradient_output.readlines()
-            # Created deployment: 7c16c005-2de3-4e15-817d-de01bc117f74
-            logger.debug(lines)
-            try:
-                deployment = lines[0].strip()
-                deployment = deployment.split(":")
-                if deployment[0].strip() == "Created deployment":
-                    return deployment[1].strip()
-            except:
-                pass
-            logger.error("Failed to create deployment")
+        gradient_output = io.StringIO()
+        try:
+            exit_code = logged_subprocess(
+                "Gradient deployments create",
+                [
+                    "gradient",
+                    "deployments",
+                    "create",
+                    "--name",
+                    name,
+                    "--projectId",
+                    project_id,
+                    "--clusterId",
+                    cluster_id,
+                    "--apiKey",
+                    api_key,
+                    "--spec",
+                    spec_file,
+                ],
+                file_output=gradient_output,
+                environ=environ,
+            )
+        except Exception as e:
+            logger.exception(e)
             return None
 
+        lines = gradient_output.getvalue().splitlines()
+        # Created deployment: 7c16c005-2de3-4e15-817d-de01bc117f74
+        logger.debug(lines)
+        try:
+            deployment = lines[0].strip()
+            deployment = deployment.split(":")
+            if deployment[0].strip() == "Created deployment":
+                return deployment[1].strip()
+        except:
+            pass
+        logger.error("Failed to create deployment")
+        return None
+
     def update_deployment(instance_id):
-        with tempfile.NamedTemporaryFile(mode="w+t") as gradient_output:
-            try:
-                exit_code = logged_subprocess(
-                    "Gradient deployments update",
-                    [
-                        "gradient",
-                        "deployments",
-                        "update",
-                        "--id",
-                        instance_id,
-                        "--apiKey",
-                        api_key,
-                        "--spec",
-                        spec_file,
-                    ],
-                    file_output=gradient_output,
-                    environ=environ,
-                )
-            except Exception as e:
-                logger.exception(e)
-                return None
-
-            gradient_output.seek(0)
-            lines = gradient_output.readlines()
-            logger.debug(lines)
-            # Updated deployment: 7c16c005-2de3-4e15-817d-de01bc117f74
-            try:
-                deployment = lines[0].strip()
-                deployment = deployment.split(":")
-                if deployment[0].strip() == "Updated deployment":
-                    return deployment[1].strip()
-            except:
-                pass
-            logger.error("Failed to update deployment")
+        gradient_output = io.StringIO()
+        try:
+            exit_code = logged_subprocess(
+                "Gradient deployments update",
+                [
+                    "gradient",
+                    "deployments",
+                    "update",
+                    "--id",
+                    instance_id,
+                    "--apiKey",
+                    api_key,
+                    "--spec",
+                    spec_file,
+                ],
+                file_output=gradient_output,
+                environ=environ,
+            )
+        except Exception as e:
+            logger.exception(e)
             return None
 
+        lines = gradient_output.getvalue().splitlines()
+        logger.debug(lines)
+        # Updated deployment: 7c16c005-2de3-4e15-817d-de01bc117f74
+        try:
+            deployment = lines[0].strip()
+            deployment = deployment.split(":")
+            if deployment[0].strip() == "Updated deployment":
+                return deployment[1].strip()
+        except:
+            pass
+        logger.error("Failed to update deployment")
+        return None
+
     logger.info(
         f"> Deploying {name} to {args.deploy_platform} (ProjectID {project_id} ClusterID {cluster_id})"
     )
@@ -247,49 +293,43 @@ def deploy(
             f"Requesting {instance_type} to serve {total_application_ipus} IPUS"
         )
 
-        MARKUP_SECRET_VALUE_BEGIN = "#SECRET VALUE BEGIN"
-        MARKUP_SECRET_VALUE_END = "#SECRET VALUE END"
-
-        with open(spec_file, "w") as spec:
-            spec.write("enabled: true\n")
-            spec.write(f"image: {package_tag}\n")
-            spec.write(f"containerRegistry: {containerRegistry}\n")
-            spec.write(f"port: {args.port}\n")
-            spec.write("env:\n")
-            if len(ssf_options):
-                spec.write("  - name: SSF_OPTIONS\n")
-                spec.write(f"    value: \"{' '.join(ssf_options)}\"\n")
-                for e in add_env:
-                    spec.write(f"  - name: {e[0]}\n")
-                    markup_secret = "secret" in e[2]
-                    if markup_secret:
-                        spec.write(f"{MARKUP_SECRET_VALUE_BEGIN}\n")
-                    if "\n" in e[1]:
-                        spec.write(f"    value: |-\n")
-                        for line in e[1].split("\n"):
-                            spec.write(f"      {line}\n")
-                    else:
-                        spec.write(f'    value: "{e[1]}"\n')
-                    if markup_secret:
-                        spec.write(f"{MARKUP_SECRET_VALUE_END}\n")
-            spec.write("resources:\n")
-            spec.write(f"  replicas: {replicas}\n")
-            spec.write(f"  instanceType: {instance_type}\n")
-
-        # Log the final spec file, but be careful to avoid
+        # Build the complete spec in memory.
+        spec = [
+            "enabled: true",
+            f"image: {package_tag}",
+            f"containerRegistry: {containerRegistry}",
+            f"port: {args.port}",
+            "env:",
+        ]
+        if len(ssf_options):
+            spec += ["  - name: SSF_OPTIONS", f"    value: \"{' '.join(ssf_options)}\""]
+            for e in add_env:
+                spec.append(f"  - name: {e[0]}")
+                markup_secret = "secret" in e[2]
+                if markup_secret:
+                    spec.append(MARKUP_SECRET_VALUE_BEGIN)
+                if "\n" in e[1]:
+                    spec.append(f"    value: |-")
+                    spec += [f"      {line}" for line in e[1].split("\n")]
+                else:
+                    spec.append(f'    value: "{e[1]}"')
+                if markup_secret:
+                    spec.append(MARKUP_SECRET_VALUE_END)
+        spec += [
+            "resources:",
+            f"  replicas: {replicas}",
+            f"  instanceType: {instance_type}",
+        ]
+
+        # Write the spec file in one go.
+        spec = "\n".join(spec) + "\n"
+        write_file_atomic(spec_file, spec)
+
+        # Log the final spec (from memory), but be careful to avoid
         # leaking any secrets (e.g. SSH keys).
-        with open(spec_file, "r") as spec:
-            spec = spec.readlines()
-            hide = False
-            for line in spec:
-                line = line.rstrip()
-                if line == MARKUP_SECRET_VALUE_BEGIN:
-                    hide = True
-                    logger.debug("Spec>     value: ##############")
-                elif line == MARKUP_SECRET_VALUE_END:
-                    hide = False
-                elif not hide:
-                    logger.debug("Spec> " + line)
+        masked_spec = MARKUP_SECRET_VALUE_RE.sub("    value: ##############", spec)
+        for line in masked_spec.splitlines():
+            logger.debug("Spec> " + line)
 
     instance_id = get_existing_instance_id()
 
@@ -1,15 +1,57 @@
 # Copyright (c) 2023 Graphcore Ltd. All rights reserved.
-import tempfile
+import http.client
+import io
+import json
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import threading
 import time
+from threading import Thread
 from typing import List
+from urllib.parse import quote
 from ssf.utils import logged_subprocess
 
+DOCKER_SOCKET = "/var/run/docker.sock"
 
-def logged_docker_command(label, args, file_output=None, environ=None):
+# Resolved docker CLI executables, keyed by (name, PATH searched).
+_executables = {}
+
+
+def _spawn_args(args: List[str], environ: dict = None) -> List[str]:
+    # Resolve the executable to an absolute path; together with close_fds=False
+    # this lets subprocess use posix_spawn, which doesn't copy the (possibly
+    # large) parent address space like fork does.
+    # File descriptors opened by Python are non-inheritable so aren't leaked.
+    # The executable is looked up in the PATH of the environment it runs with.
+    path = (environ or os.environ).get("PATH")
+    key = (args[0], path)
+    executable = _executables.get(key)
+    if executable is None:
+        executable = _executables[key] = shutil.which(args[0], path=path) or args[0]
+    return [executable] + args[1:]
+
+
+def logged_docker_command(
+    label,
+    args,
+    file_output=None,
+    environ=None,
+    stdout_log_level=logging.DEBUG,
+    stderr_log_level=logging.DEBUG,
+):
     error = None
     try:
         exit_code = logged_subprocess(
-            label, args, file_output=file_output, environ=environ
+            label,
+            _spawn_args(args, environ),
+            file_output=file_output,
+            environ=environ,
+            stdout_log_level=stdout_log_level,
+            stderr_log_level=stderr_log_level,
+            close_fds=False,
         )
         if exit_code:
             error = f"Exit code {exit_code}"
@@ -18,34 +60,187 @@ def logged_docker_command(label, args, file_output=None, environ=None):
     return error
 
 
+class _DockerSocketConnection(http.client.HTTPConnection):
+    """HTTP connection to the local Docker Engine API unix socket."""
+
+    def __init__(self, socket_path: str):
+        super().__init__("localhost")
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+# Kept alive and reused by successive engine queries.
+_engine_connection = None
+_engine_lock = threading.Lock()
+
+
+def _docker_context_selected() -> bool:
+    # A context (e.g. rootless, Docker Desktop or remote) may point the CLI at
+    # another daemon than the one listening on the default socket.
+    if os.environ.get("DOCKER_CONTEXT", "default") != "default":
+        return True
+    config_dir = os.environ.get("DOCKER_CONFIG", os.path.expanduser("~/.docker"))
+    try:
+        with open(os.path.join(config_dir, "config.json"), "rt") as config_file:
+            config = json.load(config_file)
+    except (OSError, ValueError):
+        return False
+    if not isinstance(config, dict):
+        return False
+    return config.get("currentContext", "default") not in (None, "", "default")
+
+
+def _engine_available() -> bool:
+    # Only use the socket when the CLI would use it too.
+    return (
+        "DOCKER_HOST" not in os.environ
+        and not _docker_context_selected()
+        and os.path.exists(DOCKER_SOCKET)
+    )
+
+
+def _engine_inspect(application_id: str) -> dict:
+    """Inspect a container through the Docker Engine API
+    :param application_id: container name
+    :return: Returns the container description as a dict or None if the container is not found
+    :raises: OSError or http.client.HTTPException if the engine can't be queried
+    """
+    global _engine_connection
+    with _engine_lock:
+        if _engine_connection is None:
+            _engine_connection = _DockerSocketConnection(DOCKER_SOCKET)
+        try:
+            _engine_connection.request(
+                "GET", f"/containers/{quote(application_id, safe='')}/json"
+            )
+            response = _engine_connection.getresponse()
+            body = response.read()
+        except:
+            _engine_connection.close()
+            _engine_connection = None
+            raise
+    if response.status == 404:
+        return None
+    if response.status != 200:
+        raise http.client.HTTPException(f"HTTP {response.status} {body[:200]}")
+    return json.loads(body)
+
+
+def _engine_follow_logs(application_id: str):
+    """Follow container logs through the Docker Engine API
+    :param application_id: container name
+    :return: Returns (lines, close) where lines iterates the log lines (stdout and stderr)
+             until the container stops and close() ends the stream
+    :raises: OSError or http.client.HTTPException if the engine can't be queried
+    """
+    container = _engine_inspect(application_id)
+    if container is None:
+        raise http.client.HTTPException(f"Container {application_id} not found")
+    # Without a TTY, stdout and stderr are multiplexed in frames, each with an
+    # 8 bytes header: stream type (1 byte), padding (3 bytes), size (4 bytes).
+    multiplexed = not container["Config"]["Tty"]
+
+    connection = _DockerSocketConnection(DOCKER_SOCKET)
+    connection.request(
+        "GET",
+        f"/containers/{quote(application_id, safe='')}/logs?follow=1&stdout=1&stderr=1",
+    )
+    response = connection.getresponse()
+    if response.status != 200:
+        connection.close()
+        raise http.client.HTTPException(f"HTTP {response.status}")
+
+    def read_lines():
+        if not multiplexed:
+            for line in response:
+                yield line.decode(errors="replace")
+            return
+        pending = b""
+        while True:
+            header = response.read(8)
+            if len(header) < 8:
+                break
+            pending += response.read(int.from_bytes(header[4:], "big"))
+            *complete, pending = pending.split(b"\n")
+            for line in complete:
+                yield line.decode(errors="replace") + "\n"
+        if pending:
+            yield pending.decode(errors="replace")
+
+    def lines():
+        try:
+            yield from read_lines()
+        finally:
+            connection.close()
+
+    def close():
+        # Ends the stream; the connection is closed by the reader.
+        try:
+            connection.sock.shutdown(socket.SHUT_RDWR)
+        except (AttributeError, OSError):
+            pass
+
+    return lines(), close
+
+
+def inspect_state(application_id: str, logger=None) -> dict:
+    """Get the state of an application container
+    :param application_id: container name
+    :param logger: use provided logger or None
+    :return: Returns the container state as a dict (e.g. {"Status": "running", "Running": True, ...})
+             or None if the container is not found
+    """
+    if _engine_available():
+        try:
+            container = _engine_inspect(application_id)
+            if container is not None:
+                state = container["State"]
+                if logger:
+                    logger.debug(f"Container {application_id} state {state}")
+                return state
+            # Not found by this daemon; let the CLI give the definitive answer.
+            if logger:
+                logger.debug(
+                    f"Container {application_id} not found by docker engine, using docker CLI"
+                )
+        except (OSError, http.client.HTTPException, ValueError, KeyError) as e:
+            if logger:
+                logger.debug(f"Docker engine query failed ({e}), using docker CLI")
+
+    output = io.StringIO()
+    error = logged_docker_command(
+        "inspect",
+        [
+            "docker",
+            "container",
+            "inspect",
+            "-f",
+            "{{json .State}}",
+            application_id,
+        ],
+        file_output=output,
+    )
+    if error:
+        if logger:
+            logger.debug(f"Container {application_id} state unknown {error}")
+        return None
+    lines = output.getvalue().splitlines()
+    if logger:
+        logger.debug(lines)
+    return json.loads(lines[0])
+
+
 def is_running(application_id: str, logger=None) -> bool:
     """Test if an application container is running
     :param application_id: container name
     :param logger: use provided logger or None
     :return: Returns True iff application_id is found and state is running
     """
-    with tempfile.NamedTemporaryFile(mode="w+t") as output:
-        error = logged_docker_command(
-            "is_running",
-            [
-                "docker",
-                "container",
-                "inspect",
-                "-f",
-                "'{{.State.Running}}'",
-                application_id,
-            ],
-            file_output=output,
-        )
-        if error:
-            if logger:
-                logger.debug(f"Container {application_id} assumed not running {error}")
-            return False
-        output.seek(0)
-        lines = output.readlines()
-        if logger:
-            logger.debug(lines)
-        return lines[0].strip() == "'true'"
+    state = inspect_state(application_id, logger)
+    return state is not None and state["Running"]
 
 
 def is_stopped(application_id: str, logger=None) -> bool:
@@ -54,28 +249,8 @@ def is_stopped(application_id: str, logger=None) -> bool:
     :param logger: use provided logger or None
     :return: Returns True iff application_id is found and state is stopped
     """
-    with tempfile.NamedTemporaryFile(mode="w+t") as output:
-        error = logged_docker_command(
-            "is_stopped",
-            [
-                "docker",
-                "container",
-                "inspect",
-                "-f",
-                "'{{.State.Running}}'",
-                application_id,
-            ],
-            file_output=output,
-        )
-        if error:
-            if logger:
-                logger.debug(f"Container {application_id} assumed not stopped {error}")
-            return False
-        output.seek(0)
-        lines = output.readlines()
-        if logger:
-            logger.debug(lines)
-        return lines[0].strip() == "'false'"
+    state = inspect_state(application_id, logger)
+    return state is not None and not state["Running"]
 
 
 def start(
@@ -107,38 +282,37 @@ def start(
         package_tag,
     ]
 
-    with tempfile.NamedTemporaryFile(mode="w+t") as start_output:
-        if ipus > 0:
-            error = logged_docker_command(
-                "docker run",
-                ["gc-docker", "--", "-d"] + docker_args,
-                file_output=start_output,
-                environ=env,
-            )
-            if error:
-                if logger:
-                    logger.error(
-                        f"gc-docker run for {application_id} {package_tag} errored ({error})"
-                    )
-                return False
-        else:
-            error = logged_docker_command(
-                "docker run",
-                ["docker", "run", "-d", "--network", "host"] + docker_args,
-                file_output=start_output,
-            )
-            if error:
-                if logger:
-                    logger.error(
-                        f"docker run for {application_id} {package_tag} errored ({error})"
-                    )
-                return False
+    start_output = io.StringIO()
+    if ipus > 0:
+        error = logged_docker_command(
+            "docker run",
+            ["gc-docker", "--", "-d"] + docker_args,
+            file_output=start_output,
+            environ=env,
+        )
+        if error:
+            if logger:
+                logger.error(
+                    f"gc-docker run for {application_id} {package_tag} errored ({error})"
+                )
+            return False
+    else:
+        error = logged_docker_command(
+            "docker run",
+            ["docker", "run", "-d", "--network", "host"] + docker_args,
+            file_output=start_output,
+        )
+        if error:
+            if logger:
+                logger.error(
+                    f"docker run for {application_id} {package_tag} errored ({error})"
+                )
+            return False
 
-        start_output.seek(0)
-        lines = start_output.readlines()
-        if logger:
-            logger.debug(lines)
-        return True
+    lines = start_output.getvalue().splitlines()
+    if logger:
+        logger.debug(lines)
+    return True
 
 
 def remove(application_id: str, logger=None) -> bool:
@@ -147,20 +321,19 @@ def remove(application_id: str, logger=None) -> bool:
     :param logger: use provided logger or None
     :return: Returns True unless there was a docker error
     """
-    with tempfile.NamedTemporaryFile(mode="w+t") as output:
-        error = logged_docker_command(
-            "docker rm", ["docker", "rm", "-f", application_id], file_output=output
-        )
-        if error:
-            if logger:
-                logger.error(f"docker stop for {application_id} errored ({error})")
-            return False
-
-        output.seek(0)
-        lines = output.readlines()
+    output = io.StringIO()
+    error = logged_docker_command(
+        "docker rm", ["docker", "rm", "-f", application_id], file_output=output
+    )
+    if error:
         if logger:
-            logger.debug(lines)
-        return True
+            logger.error(f"docker stop for {application_id} errored ({error})")
+        return False
+
+    lines = output.getvalue().splitlines()
+    if logger:
+        logger.debug(lines)
+    return True
 
 
 def stop(application_id: str, logger=None) -> bool:
@@ -169,20 +342,19 @@ def stop(application_id: str, logger=None) -> bool:
     :param logger: use provided logger or None
     :return: Returns True iff application was running and is succesfully stopped
     """
-    with tempfile.NamedTemporaryFile(mode="w+t") as output:
-        error = logged_docker_command(
-            "docker stop", ["docker", "stop", application_id], file_output=output
-        )
-        if error:
-            if logger:
-                logger.error(f"docker stop for {application_id} errored ({error})")
-            return False
-
-        output.seek(0)
-        lines = output.readlines()
+    output = io.StringIO()
+    error = logged_docker_command(
+        "docker stop", ["docker", "stop", application_id], file_output=output
+    )
+    if error:
         if logger:
-            logger.debug(lines)
-        return True
+            logger.error(f"docker stop for {application_id} errored ({error})")
+        return False
+
+    lines = output.getvalue().splitlines()
+    if logger:
+        logger.debug(lines)
+    return True
 
 
 def wait_ready_from_logs(
@@ -195,52 +367,72 @@ def wait_ready_from_logs(
     :param logger: use provided logger or None
     :return: Returns True iff container is running and magic string is found before timeout expires
     """
-    WAIT_PERIOD = 5
     INFO_PERIOD = 60
 
-    start = time.time()
-    last_info = start
-
-    while True:
-        time.sleep(WAIT_PERIOD)
+    if not is_running(application_id):
+        if logger:
+            logger.error(f"docker container for {application_id} is not running")
+        return False
 
-        if not is_running(application_id):
+    # Follow the logs from the beginning; we can't tail this because we can't guarantee
+    # the application won't log something after Uvicorn is ready.
+    # The stream ends if the container stops.
+    close_follow = None
+    if _engine_available():
+        try:
+            follow_lines, close_follow = _engine_follow_logs(application_id)
+        except (OSError, http.client.HTTPException, ValueError, KeyError) as e:
             if logger:
-                logger.error(f"docker container for {application_id} is not running")
-            return False
+                logger.debug(f"Docker engine logs failed ({e}), using docker CLI")
+    if close_follow is None:
+        follow = subprocess.Popen(
+            _spawn_args(["docker", "logs", "--follow", application_id]),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            encoding="utf-8",
+            errors="replace",
+            close_fds=False,
+        )
+        follow_lines = follow.stdout
 
-        with tempfile.NamedTemporaryFile(mode="w+t") as log_output:
-            # We can't tail this because we can't guarantee the application won't log something
-            # after Uvicorn is ready.
-            error = logged_docker_command(
-                "docker logs",
-                ["docker", "logs", application_id],
-                stdout_log_level=None,
-                stderr_log_level=None,
-                file_output=log_output,
-            )
-            if error:
-                if logger:
-                    logger.error(f"docker logs for {application_id} errored ({error})")
-                return False
+        def close_follow():
+            follow.kill()
+            follow.wait()
 
-            log_output.seek(0)
-            lines = log_output.readlines()
-            ready = [l for l in lines if ready_magic in l]
-            if len(ready):
-                return True
+    ready = False
+    last_line = None
+    done = threading.Event()
 
-        now = time.time()
-        elapsed = now - start
-        if elapsed > timeout:
-            if logger:
-                logger.error(f"Timeout >{timeout} waiting for {application_id}")
-            return False
+    def reader():
+        nonlocal ready, last_line
+        try:
+            for line in follow_lines:
+                last_line = line
+                if ready_magic in line:
+                    ready = True
+                    break
+        except (OSError, ValueError, http.client.HTTPException):
+            # Stream closed.
+            pass
+        done.set()
+
+    Thread(target=reader, daemon=True).start()
 
-        if (now - last_info) > INFO_PERIOD:
+    try:
+        deadline = time.monotonic() + timeout
+        while not done.wait(min(INFO_PERIOD, max(deadline - time.monotonic(), 0))):
+            if time.monotonic() >= deadline:
+                if logger:
+                    logger.error(f"Timeout >{timeout} waiting for {application_id}")
+                return False
             if logger:
-                logger.info(f"Log status: {lines[-1]}")
-            last_info = now
+                logger.info(f"Log status: {last_line}")
+    finally:
+        close_follow()
+
+    if not ready and logger:
+        logger.error(f"docker container for {application_id} is not running")
+    return ready
 
 
 def log(application_id: str, logger) -> bool:
@@ -249,9 +441,8 @@ def log(application_id: str, logger) -> bool:
     :param logger: use provided logger
     :return: Returns True iff container exists and logs are succesfully captured
     """
-    with tempfile.NamedTemporaryFile(mode="w+t") as log_output:
-        error = logged_docker_command("docker logs", ["docker", "logs", application_id])
-        if error:
-            logger.error(f"docker logs for {application_id} errored ({error})")
-            return False
-        return True
+    error = logged_docker_command("docker logs", ["docker", "logs", application_id])
+    if error:
+        logger.error(f"docker logs for {application_id} errored ({error})")
+        return False
+    return True
@@ -1,5 +1,6 @@
 # Copyright (c) 2023 Graphcore Ltd. All rights reserved.
 from datetime import datetime
+from itertools import chain
 import logging
 import os
 import typing
@@ -32,11 +33,8 @@ def get_input_format(inputs, default=None):
     # to avoid JSON param behaviour in parser
 
     # Check presence of any custom inputs
-    custom = False
-    for param in inputs:
-        if param.dtype in handlers["custom"]:
-            custom = True
-            break
+    custom_types = handlers["custom"]
+    custom = any(param.dtype in custom_types for param in inputs)
 
     # If any generic inputs are set together with custom inputs, input format is *always* query.
     if custom:
@@ -65,21 +63,27 @@ def generate(ssf_config: SSFConfig, idx: int, application_endpoint: str):
     inputs = endpoint.inputs
     outputs = endpoint.outputs
 
+    generic_types = handlers["generic"]
+    custom_types = handlers["custom"]
+    untyped_list = generic_types["ListAny"]
+    known_types = generic_types.keys() | custom_types.keys()
+
     for param in inputs:
-        if (
-            param.dtype not in handlers["generic"]
-            and param.dtype not in handlers["custom"]
-        ):
+        if param.dtype not in known_types:
             raise SSFExceptionApplicationConfigError(f"Input with unknown type {param}")
     for param in outputs:
-        if (
-            param.dtype not in handlers["generic"]
-            and param.dtype not in handlers["custom"]
-        ):
+        if param.dtype not in known_types:
             raise SSFExceptionApplicationConfigError(
                 f"Output with unknown type {param}"
             )
 
+    # Resolve type handlers once per parameter:
+    # (param, handler, True if generic type) for inputs, (param, handler) for outputs.
+    input_handlers = [
+        (param, handler(param.dtype), param.dtype in generic_types) for param in inputs
+    ]
+    output_handlers = [(param, handler(param.dtype)) for param in outputs]
+
     default = None
     if endpoint.http_param_format is not None:
         default = endpoint.http_param_format
@@ -98,254 +102,248 @@ def generate(ssf_config: SSFConfig, idx: int, application_endpoint: str):
         def __init__(self, ssf_config: SSFConfig, endpoint: EndpointDescription):
             self.ssf_config = ssf_config
             self.endpoint = endpoint
+            # Symbol => method generating its replacement text.
+            self.symbols = {
+                "inputs_as_base_model": self.inputs_as_base_model,
+                "inputs_as_params": self.inputs_as_params,
+                "inputs_as_doc_strings": self.inputs_as_doc_strings,
+                "outputs_as_doc_strings": self.outputs_as_doc_strings,
+                "preprocess": self.preprocess,
+                "request_params_fields": self.request_params_fields,
+                "request_meta_fields": self.request_meta_fields,
+                "postprocess": self.postprocess,
+                "returns": self.returns,
+            }
+            # (leader, indent) => separator joining the generated lines.
+            self._seps = {}
+
+        def _join(self, lines: list, indent: int, leader: str = "\n") -> str:
+            sep = self._seps.get((leader, indent))
+            if sep is None:
+                sep = self._seps[(leader, indent)] = leader + " " * indent
+            return sep.join(lines)
+
+        def inputs_as_base_model(self, indent: int) -> str:
+            # This converts the ssf_config input list to a FastAPI parameter list (one-per-line, comma-separated)
+            parsed_inputs = []
+
+            examples = []
+
+            # If format is query - nothing is added to BaseModel for this symbol_id
+            if input_format == "query":
+                return ""
+
+            # If format is json - inputs are added to BaseModel expecting no inputs to be custom types.
+            else:
+                for param, param_handler, generic in input_handlers:
+                    if generic:
+                        parsed_inputs.extend(
+                            param_handler.gen_param(
+                                self.ssf_config, param, is_basemodel=True
+                            )
+                        )
+                        if param.example is not None:
+                            examples.extend(
+                                param_handler.gen_example(self.ssf_config, param)
+                            )
+                    else:
+                        # This should ideally never be raised
+                        raise SSFExceptionInternalError(
+                            "Input format detected as JSON while containing non-JSONable params (e.g. TempFile). Use 'query'."
+                        )
 
-        def parse(self, symbol_id: str, indent: int = 0) -> str:
-            if symbol_id.find("endpoint.") == 0:
-                # Where symbols have syntax ".... {{endpoint.< >}} ...."
-                # Will be replaced with lookup into the "endpoint." namespace.
-                return lookup_dict(self.endpoint, symbol_id, namespaced=True)
+            if len(parsed_inputs) == 0:
+                raise SSFExceptionApplicationConfigError(f"Inputs empty")
+
+            if len(examples) > 0:
+                parsed_inputs.extend(
+                    [
+                        "class Config:",
+                        "  schema_extra = {",
+                        "    'examples': [",
+                        "       {" + ", ".join(examples) + "}",
+                        "    ]",
+                        "  }",
+                    ]
+                )
 
-            elif symbol_id == "inputs_as_base_model":
-                # This converts the ssf_config input list to a FastAPI parameter list (one-per-line, comma-separated)
-                parsed_inputs = []
+            return self._join(parsed_inputs, indent)
 
-                examples = []
+        def inputs_as_params(self, indent: int) -> str:
+            base_model_set = False
+            parsed_inputs = []
 
-                # If format is query - nothing is added to BaseModel for this symbol_id
-                if input_format == "query":
-                    return ""
+            if input_format == "json":
+                # Always the same, Pydantic BaseModel contains all inputs, custom inputs not passed in json format.
+                parsed_inputs.extend([f"inputs: Inputs"])
 
-                # If format is json - inputs are added to BaseModel expecting no inputs to be custom types.
-                else:
-                    for param in inputs:
-                        if param.dtype in handlers["generic"]:
-                            parsed_inputs.extend(
-                                handler(param.dtype).gen_param(
-                                    self.ssf_config, param, is_basemodel=True
-                                )
-                            )
-                            if param.example is not None:
-                                examples.extend(
-                                    handler(param.dtype).gen_example(
-                                        self.ssf_config, param
-                                    )
-                                )
-                        else:
-                            # This should ideally never be raised
-                            raise SSFExceptionInternalError(
-                                "Input format detected as JSON while containing non-JSONable params (e.g. TempFile). Use 'query'."
+            if input_format == "query":
+                for param, param_handler, generic in input_handlers:
+                    # If generic types, the parameter default is '=Query(...)' for query format
+                    if generic:
+                        parsed_inputs.extend(
+                            param_handler.gen_param(
+                                self.ssf_config, param, is_basemodel=False
                             )
+                        )
 
-                if len(parsed_inputs) == 0:
-                    raise SSFExceptionApplicationConfigError(f"Inputs empty")
+                    # if custom types, add custom parameters to endpoint args as normal
+                    else:
+                        parsed_inputs.extend(
+                            param_handler.gen_param(self.ssf_config, param)
+                        )
 
-                if len(examples) > 0:
-                    parsed_inputs.extend(
-                        [
-                            "class Config:",
-                            "  schema_extra = {",
-                            "    'examples': [",
-                            "       {" + ", ".join(examples) + "}",
-                            "    ]",
-                            "  }",
-                        ]
-                    )
+            return self._join(parsed_inputs, indent, ",\n")
 
-                split_string = "\n" + " " * indent
-                insert_lines = split_string.join(parsed_inputs)
+        def inputs_as_doc_strings(self, indent: int) -> str:
+            # This converts the ssf_config input list to a doc parameter list (one-per-line)
+            parsed_inputs = list(
+                chain.from_iterable(
+                    param_handler.gen_docstring(self.ssf_config, param)
+                    for param, param_handler, _ in input_handlers
+                )
+            )
 
-                return insert_lines
+            return self._join(parsed_inputs, indent)
 
-            elif symbol_id == "inputs_as_params":
-                base_model_set = False
-                parsed_inputs = []
+        def outputs_as_doc_strings(self, indent: int) -> str:
+            # This converts the ssf_config output list to a doc parameter list (one-per-line)
+            parsed_inputs = list(
+                chain.from_iterable(
+                    param_handler.gen_docstring(self.ssf_config, param)
+                    for param, param_handler in output_handlers
+                )
+            )
 
-                if input_format == "json":
-                    # Always the same, Pydantic BaseModel contains all inputs, custom inputs not passed in json format.
-                    parsed_inputs.extend([f"inputs: Inputs"])
+            return self._join(parsed_inputs, indent)
 
-                if input_format == "query":
-                    for param in inputs:
-                        # If generic types, the parameter default is '=Query(...)' for query format
-                        if param.dtype in handlers["generic"]:
-                            parsed_inputs.extend(
-                                handler(param.dtype).gen_param(
-                                    self.ssf_config, param, is_basemodel=False
-                                )
-                            )
+        def preprocess(self, indent: int) -> str:
+            # This adds ssf type specific pre-processing (multiple lines)
+            parsed_inputs = list(
+                chain.from_iterable(
+                    param_handler.gen_preprocess(self.ssf_config, param)
+                    for param, param_handler, _ in input_handlers
+                )
+            )
 
-                        # if custom types, add custom parameters to endpoint args as normal
-                        else:
-                            parsed_inputs.extend(
-                                handler(param.dtype).gen_param(self.ssf_config, param)
-                            )
+            return self._join(parsed_inputs, indent)
 
-                split_string = ",\n" + " " * indent
-                insert_lines = split_string.join(parsed_inputs)
+        def request_params_fields(self, indent: int) -> str:
+            # This converts the ssf_config input list to dictionary fields for the queued request
+            # (one-per-line, comma-separated)
+            parsed_inputs = []
 
-                return insert_lines
+            # Checks if input format is BaseModel, in which case the params are called from the BaseModel class
+            is_basemodel = input_format == "json"
 
-            elif symbol_id == "inputs_as_doc_strings":
-                # This converts the ssf_config input list to a doc parameter list (one-per-line)
-                parsed_inputs = []
-                for param in inputs:
+            for param, param_handler, generic in input_handlers:
+                # Tell the request dictionary generation handler whether the input format is a BaseModel or not.
+                if generic:
                     parsed_inputs.extend(
-                        handler(param.dtype).gen_docstring(self.ssf_config, param)
+                        param_handler.gen_request_dict(
+                            self.ssf_config, param, is_basemodel
+                        )
                     )
 
-                split_string = "\n" + " " * indent
-                insert_lines = split_string.join(parsed_inputs)
-                return insert_lines
-
-            elif symbol_id == "outputs_as_doc_strings":
-                # This converts the ssf_config output list to a doc parameter list (one-per-line)
-                parsed_inputs = []
-                for param in outputs:
+                # This should not be called if input format is JSON, but needs to be separately defined anyway
+                # when the input format is Query, `gen_request_dict` does not accept the `is_basemodel` argument.
+                else:
                     parsed_inputs.extend(
-                        handler(param.dtype).gen_docstring(self.ssf_config, param)
+                        param_handler.gen_request_dict(self.ssf_config, param)
                     )
 
-                split_string = "\n" + " " * indent
-                insert_lines = split_string.join(parsed_inputs)
-                return insert_lines
-
-            elif symbol_id == "preprocess":
-                # This adds ssf type specific pre-processing (multiple lines)
-                parsed_inputs = []
-                for param in inputs:
-                    parsed_inputs.extend(
-                        handler(param.dtype).gen_preprocess(self.ssf_config, param)
-                    )
+            return self._join(parsed_inputs, indent, ",\n")
 
-                split_string = "\n" + " " * indent
-                insert_lines = split_string.join(parsed_inputs)
-                return insert_lines
+        def request_meta_fields(self, indent: int) -> str:
+            # This converts the extra metadata to dictionary fields for the queued request (one-per-line, comma-separated)
+            meta_fields = [
+                f"'endpoint_id' : \"{self.endpoint.id}\"",
+                f"'endpoint_version' : \"{self.endpoint.version}\"",
+                f"'endpoint_index' : int({idx})",
+            ]
 
-            elif symbol_id == "request_params_fields":
-                # This converts the ssf_config input list to dictionary fields for the queued request
-                # (one-per-line, comma-separated)
-                parsed_inputs = []
+            return self._join(meta_fields, indent, ",\n")
 
-                # Checks if input format is BaseModel, in which case the params are called from the BaseModel class
-                is_basemodel = input_format == "json"
+        def postprocess(self, indent: int) -> str:
+            # This adds ssf type specific post-processing (multiple lines)
+            parsed_inputs = list(
+                chain.from_iterable(
+                    param_handler.gen_postprocess(self.ssf_config, param)
+                    for param, param_handler, _ in input_handlers
+                )
+            )
 
-                for param in inputs:
-                    # Tell the request dictionary generation handler whether the input format is a BaseModel or not.
-                    if param.dtype in handlers["generic"]:
-                        parsed_inputs.extend(
-                            handler(param.dtype).gen_request_dict(
-                                self.ssf_config, param, is_basemodel
-                            )
-                        )
+            return self._join(parsed_inputs, indent)
 
-                    # This should not be called if input format is JSON, but needs to be separately defined anyway
-                    # when the input format is Query, `gen_request_dict` does not accept the `is_basemodel` argument.
-                    else:
-                        parsed_inputs.extend(
-                            handler(param.dtype).gen_request_dict(
-                                self.ssf_config, param
-                            )
-                        )
+        def returns(self, indent: int) -> str:
+            # This adds ssf type specific response (multiple lines)
+            parsed_outputs = []
+            parsed_fields = []
+            parsed_contents = []
 
-                split_string = ",\n" + " " * indent
-                insert_lines = split_string.join(parsed_inputs)
-                return insert_lines
+            for param, param_handler in output_handlers:
+                ret = param_handler.gen_return(self.ssf_config, param)
 
-            elif symbol_id == "request_meta_fields":
-                # This converts the extra metadata to dictionary fields for the queued request (one-per-line, comma-separated)
-                meta_fields = []
-                meta_fields.extend([f"'endpoint_id' : \"{str(self.endpoint.id)}\""])
-                meta_fields.extend(
-                    [f"'endpoint_version' : \"{str(self.endpoint.version)}\""]
+                if type(ret) is tuple:
+                    parsed_fields.append(ret)
+                else:
+                    parsed_contents.append(ret)
+
+            logger.debug(f"parsed_fields={parsed_fields}")
+            logger.debug(f"parsed_contents={parsed_contents}")
+
+            if len(parsed_contents) == 0:
+                # This builds a dictionary of output items from results.
+                # Then wraps it with an ORJSONResponse object (serialised with orjson).
+                # Typed fields are already mapped to plain Python types so only
+                # untyped lists (ListAny) are made ready with jsonable_encoder.
+                # The default headers are also returned.
+                parsed_outputs = ["return_fields = {}"]
+                for param, astype in parsed_fields:
+                    # Generate type mapping for endpoint return fields for defined output type
+                    # including support for nested lists.
+                    line = gen_output_type_mapping(param, astype)
+                    if astype == untyped_list:
+                        line = f"jsonable_encoder({line})"
+                    parsed_outputs.append(f'return_fields["{param}"] = {line}')
+
+                parsed_outputs.append(
+                    "return ORJSONResponse(content = return_fields, headers=headers)"
                 )
-                meta_fields.extend([f"'endpoint_index' : int({idx})"])
-
-                split_string = ",\n" + " " * indent
-                insert_lines = split_string.join(meta_fields)
-                return insert_lines
 
-            elif symbol_id == "postprocess":
-                # This adds ssf type specific post-processing (multiple lines)
-                parsed_inputs = []
-                for param in inputs:
-                    parsed_inputs.extend(
-                        handler(param.dtype).gen_postprocess(self.ssf_config, param)
+            elif len(parsed_contents) == 1:
+                # Single content returned.
+                # With additional outputs added to the default headers (forced to string type).
+                for param, _ in parsed_fields:
+                    parsed_outputs.append(
+                        f'headers["{param}"] = str(results["{param}"])'
                     )
+                parsed_outputs.extend(
+                    [
+                        "return Response(",
+                        f"    {parsed_contents[0]},",
+                        f"    headers=headers",
+                        ")",
+                    ]
+                )
 
-                split_string = "\n" + " " * indent
-                insert_lines = split_string.join(parsed_inputs)
-                return insert_lines
-
-            elif symbol_id == "returns":
-                # This adds ssf type specific response (multiple lines)
-                parsed_outputs = []
-                parsed_fields = []
-                parsed_contents = []
-
-                for param in outputs:
-                    ret = handler(param.dtype).gen_return(self.ssf_config, param)
-
-                    if type(ret) is tuple:
-                        parsed_fields.append(ret)
-                    else:
-                        parsed_contents.append(ret)
-
-                logger.debug(f"parsed_fields={parsed_fields}")
-                logger.debug(f"parsed_contents={parsed_contents}")
-
-                if len(parsed_contents) == 0:
-                    # This builds a dictionary of output items from results.
-                    # Then makes it ready with jsonable_encoder before
-                    # wrapping with a JSONResponse object.
-                    # The default headers are also returned.
-                    parsed_outputs = ["return_fields = {}"]
-                    for f in parsed_fields:
-                        param = f[0]
-                        astype = f[1]
-
-                        # Generate type mapping for endpoint return fields for defined output type
-                        # including support for nested lists.
-                        line = gen_output_type_mapping(param, astype)
-                        parsed_outputs.extend([f'return_fields["{param}"] = {line}'])
-
-                    parsed_outputs.extend(
-                        ["json_compatible_fields = jsonable_encoder(return_fields)"]
-                    )
-                    parsed_outputs.extend(
-                        [
-                            "return JSONResponse(content = json_compatible_fields, headers=headers)"
-                        ]
-                    )
+            else:
+                # Multiple contents returned.
+                # TODO:
+                # Would need to zip (?)
+                raise ValueError(f"Multiple contents not supported {parsed_contents}")
 
-                elif len(parsed_contents) == 1:
-                    # Single content returned.
-                    # With additional outputs added to the default headers (forced to string type).
-                    for f in parsed_fields:
-                        param = f[0]
-                        astype = "str"
-                        parsed_outputs.extend(
-                            [f'headers["{param}"] = {astype}(results["{param}"])']
-                        )
-                    parsed_outputs.extend(
-                        [
-                            "return Response(",
-                            f"    {parsed_contents[0]},",
-                            f"    headers=headers",
-                            ")",
-                        ]
-                    )
+            return self._join(parsed_outputs, indent)
 
-                else:
-                    # Multiple contents returned.
-                    # TODO:
-                    # Would need to zip (?)
-                    raise ValueError(
-                        f"Multiple contents not supported {parsed_contents}"
-                    )
+        def parse(self, symbol_id: str, indent: int = 0) -> str:
+            if symbol_id.startswith("endpoint."):
+                # Where symbols have syntax ".... {{endpoint.< >}} ...."
+                # Will be replaced with lookup into the "endpoint." namespace.
+                return lookup_dict(self.endpoint, symbol_id, namespaced=True)
 
-                split_string = "\n" + " " * indent
-                insert_lines = split_string.join(parsed_outputs)
-                return insert_lines
+            symbol = self.symbols.get(symbol_id)
+            if symbol is not None:
+                return symbol(indent)
 
             return None
 
@@ -2,6 +2,7 @@
 # Handlers SSFTypes for generating FastAPI code
 
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from typing import List, Tuple, Any
 
 from ssf.application_interface.config import SSFConfig, EndpointParam
@@ -130,30 +131,32 @@ class SSFType(ABC):
         pass
 
 
+def _example_converter(typename: str):
+    # Returns the function converting one example element to its Python literal.
+    if "str" in typename:
+        return lambda e: f"'{e}'"
+    elif "int" in typename:
+        return lambda e: f"{int(e)}"
+    elif "float" in typename:
+        return lambda e: f"{float(e)}"
+    elif "bool" in typename:
+        return lambda e: f"{e=='True'}"
+    return lambda e: f"'{e}'"
+
+
 class SSFType_Generic(SSFType):
     def __init__(self, typename: str):
         self.typename = typename
+        # The example conversion only depends on the type name.
+        self.example_listof = any(t in typename for t in ["List", "list"])
+        self.example_convert = _example_converter(typename)
 
     def get_example_string(self, param: EndpointParam):
-        def type_convert(e):
-            if "str" in self.typename:
-                return f"'{e}'"
-            elif "int" in self.typename:
-                return f"{int(e)}"
-            elif "float" in self.typename:
-                return f"{float(e)}"
-            elif "bool" in self.typename:
-                return f"{e=='True'}"
-            return f"'{e}'"
-
-        listof = any(t in self.typename for t in ["List", "list"])
-        if listof:
-            example = []
-            for e in param.example.split(","):
-                example.append(type_convert(e))
+        if self.example_listof:
+            example = map(self.example_convert, param.example.split(","))
             example_string = "[" + ",".join(example) + "]"
         else:
-            example_string = type_convert(param.example)
+            example_string = self.example_convert(param.example)
         return example_string
 
     def gen_param(
@@ -300,6 +303,8 @@ nested_types = {
 }
 
 
+# Generic handlers only hold their type name, so one instance per type is shared.
+@lru_cache(maxsize=None)
 def handler(type: str) -> SSFType:
     if type in handlers["generic"]:
         return SSFType_Generic(handlers["generic"][type])
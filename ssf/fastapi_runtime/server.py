@@ -1,15 +1,14 @@
 # Copyright (c) 2023 Graphcore Ltd. All rights reserved.
+import asyncio
 import logging
 import os
-import time
 from contextlib import asynccontextmanager
 from threading import Thread
 
 import server_health
 import server_security
 import server_authentication
-from fastapi import Depends, FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, Response
 
 from ssf.common_runtime.callbacks import notify_error_callback
 
@@ -23,7 +22,10 @@ from ssf.fastapi_runtime.server_metrics import (
     add_prometheus_instrumentator,
 )
 
-from ssf.application_interface.results import SSFExceptionFrameworkResourceError
+from ssf.application_interface.results import (
+    SSFExceptionApplicationModuleError,
+    SSFExceptionFrameworkResourceError,
+)
 from ssf.utils import load_module, ascii_to_object
 
 init_global_logging()
@@ -77,8 +79,6 @@ logger.debug(f"applications={applications}")
 # Review these to see if/when they might be removed.
 @asynccontextmanager
 async def _lifespan(app: FastAPI):
-    import asyncio
-
     try:
         logger.info("> Lifespan start")
         logger.info("Lifespan start : start application (threaded)")
@@ -99,14 +99,10 @@ async def _lifespan(app: FastAPI):
     try:
         logger.info("> Lifespan stop")
         if startup_thread.is_alive():
-            time.sleep(2)
             logger.info("Lifespan stop : joining startup thread")
             startup_thread.join()
-            logger.info("Lifespan stop : stop application")
-            applications.stop()
-        else:
-            logger.info("Lifespan stop : stop application")
-            applications.stop()
+        logger.info("Lifespan stop : stop application")
+        applications.stop()
         stop_global_logging()
     except asyncio.CancelledError:
         pass
@@ -154,6 +150,8 @@ logger.info(
     f"CORS middleware is {'enabled' if settings.enable_cors_middleware else 'disabled'}."
 )
 if settings.enable_cors_middleware:
+    from fastapi.middleware.cors import CORSMiddleware
+
     logger.info(
         f"CORS middleware allow_origin_regex {settings.cors_allow_origin_regex}."
     )
@@ -192,12 +190,21 @@ for endpoint in ssf_config.endpoints:
     logger.info(
         f"> Loading {application_id} endpoint from {endpoint_file} with module id {module_id}"
     )
-    if not os.path.exists(endpoint_file):
-        raise SSFExceptionFrameworkResourceError(
-            f"Run `clean` and `build` steps to regenerate endpoint resources."
-        )
-
-    endpoint_module = load_module(endpoint_file, module_id)
+    try:
+        endpoint_module = load_module(endpoint_file, module_id)
+    except SSFExceptionApplicationModuleError as e:
+        # Missing endpoint file (checked here rather than with a separate stat).
+        # A file missing while the endpoint module runs is an application error.
+        cause = e.__cause__
+        if (
+            isinstance(cause, FileNotFoundError)
+            and cause.filename is not None
+            and os.path.realpath(cause.filename) == os.path.realpath(endpoint_file)
+        ):
+            raise SSFExceptionFrameworkResourceError(
+                f"Run `clean` and `build` steps to regenerate endpoint resources."
+            ) from e
+        raise
     app.include_router(endpoint_module.router)
 
 # Only include API key security module and endpoint when an API key has been specified.
@@ -226,4 +233,4 @@ app.include_router(server_health.router)
 # Root end-point is always built-in.
 @app.get("/")
 async def home():
-    return {"message": "OK"}
+    return Response(b'{"message":"OK"}', media_type="application/json")
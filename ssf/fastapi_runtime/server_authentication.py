@@ -1,4 +1,8 @@
 # Copyright (c) 2023 Graphcore Ltd. All rights reserved.
+from collections import OrderedDict
+from functools import lru_cache
+from hashlib import sha256
+from typing import Dict, List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, Security
 from fastapi.responses import RedirectResponse
 from fastapi.security.api_key import APIKey, APIKeyCookie
@@ -11,11 +15,15 @@ from ssf.application_interface.results import SSFExceptionApplicationModuleError
 
 import inspect
 import logging
+import time
 
 logger = logging.getLogger()
 
 SESSION_KEY_NAME = "session_key"
 SESSION_KEY_TOKEN_PREFIX_CHARS = 16
+# Upper bound on live sessions per user: when a user logs in again beyond
+# this, that user's oldest session is dropped (other users are unaffected).
+SESSION_MAX_PER_USER = 100
 
 USER_AUTHENTICATION_MODULE_NAME = "authenticate_user"
 USER_AUTHENTICATION_FUNCTION_NAME = "authenticate_user"
@@ -26,21 +34,57 @@ router = APIRouter(tags=["Security"])
 
 security = HTTPBasic()
 
-# Map of session keys back to user ids
-sessions = {}
+# Map of hashed session keys back to (user id, expiry time).
+# Sessions share the same timeout so insertion order is also expiry order.
+sessions: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
 
+# Map of user ids to their hashed session keys (oldest first).
+user_sessions: Dict[str, List[str]] = {}
 
+
+def _session_hash(session_key: str) -> str:
+    # Only a hash of the session key is held so the table does not hold
+    # usable cookie values.
+    return sha256(session_key.encode()).hexdigest()
+
+
+def _remove_session(key_hash: str) -> str:
+    user_id, _ = sessions.pop(key_hash)
+    user_keys = user_sessions[user_id]
+    user_keys.remove(key_hash)
+    if not user_keys:
+        del user_sessions[user_id]
+    return user_id
+
+
+def _expire_sessions():
+    now = time.monotonic()
+    while sessions:
+        key_hash, (_, expiry) = next(iter(sessions.items()))
+        if expiry > now:
+            break
+        _remove_session(key_hash)
+
+
+def _find_session(session_key: str) -> Optional[str]:
+    # Returns the session's user id, None if unknown or expired.
+    session = sessions.get(_session_hash(session_key))
+    if session is None or session[1] <= time.monotonic():
+        return None
+    return session[0]
+
+
+# The authenticator is resolved on first login and reused for the lifetime
+# of the server (a failure to resolve it is not cached).
+@lru_cache(maxsize=1)
 def get_user_authenticator():
     USER_AUTHENTICATION_MODULE_FILE = settings.session_authentication_module_file
     authentication_module = load_module(
         USER_AUTHENTICATION_MODULE_FILE, USER_AUTHENTICATION_MODULE_NAME
     )
-    for _, obj in inspect.getmembers(authentication_module):
-        if (
-            inspect.isfunction(obj)
-            and obj.__name__ == USER_AUTHENTICATION_FUNCTION_NAME
-        ):
-            return obj
+    obj = getattr(authentication_module, USER_AUTHENTICATION_FUNCTION_NAME, None)
+    if inspect.isfunction(obj):
+        return obj
     raise SSFExceptionApplicationModuleError(
         f"Failure finding {USER_AUTHENTICATION_FUNCTION_NAME} in {USER_AUTHENTICATION_MODULE_FILE}."
     )
@@ -53,7 +97,7 @@ async def get_session_key(
         # Authentication is not enabled!
         return None
     elif session_key_cookie:
-        if session_key_cookie in sessions:
+        if _find_session(session_key_cookie) is not None:
             return session_key_cookie
     else:
         raise HTTPException(
@@ -65,7 +109,7 @@ async def get_session_key(
 async def check_session_key(
     session_key_cookie: str = Security(session_key_cookie),
 ):
-    if session_key_cookie and session_key_cookie in sessions:
+    if session_key_cookie and _find_session(session_key_cookie) is not None:
         return session_key_cookie
     return None
 
@@ -99,24 +143,35 @@ def create_session_for_user(user_id: str):
     # so SESSION_KEY_TOKEN_PREFIX_CHARS **must** be even length.
     assert SESSION_KEY_TOKEN_PREFIX_CHARS % 2 == 0
     session_key = token_hex(int(SESSION_KEY_TOKEN_PREFIX_CHARS / 2)) + user_id
-    sessions[session_key] = user_id
-    logger.info(f"> Created session for user_id {user_id} session_key {session_key}")
+    _expire_sessions()
+    key_hash = _session_hash(session_key)
+    expiry = time.monotonic() + settings.session_authentication_timeout
+    sessions[key_hash] = (user_id, expiry)
+    user_keys = user_sessions.setdefault(user_id, [])
+    user_keys.append(key_hash)
+    if len(user_keys) > SESSION_MAX_PER_USER:
+        dropped = user_keys[0]
+        _remove_session(dropped)
+        logger.info(f"> Dropped oldest session for user_id {user_id} ({dropped[:12]})")
+    # Only a prefix of the session key hash is logged, never the key itself.
+    logger.info(f"> Created session for user_id {user_id} ({key_hash[:12]})")
     return session_key
 
 
 def delete_session(session_key):
     user_id = get_user_id_from_session(session_key)
-    sessions.pop(session_key)
-    logger.info(f"> Deleted session for user_id {user_id} session_key {session_key}")
+    key_hash = _session_hash(session_key)
+    _remove_session(key_hash)
+    logger.info(f"> Deleted session for user_id {user_id} ({key_hash[:12]})")
 
 
 def get_user_id_from_session(session_key: str):
-    if session_key is None or session_key not in sessions:
+    user = None if session_key is None else _find_session(session_key)
+    if user is None:
         raise HTTPException(
             status_code=HTTP_401_UNAUTHORIZED,
             detail="Invalid session ID",
         )
-    user = sessions[session_key]
     return user
 
 
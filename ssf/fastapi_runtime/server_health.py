@@ -3,6 +3,7 @@ from fastapi import APIRouter, status, Response
 
 from ssf.application_interface.runtime_settings import settings
 from ssf.common_runtime.dispatcher import Application
+import json
 import logging
 
 logger = logging.getLogger()
@@ -13,6 +14,20 @@ HEALTH_ROUTE_READY = "/ready"
 HEALTH_ROUTE_LIVE = "/live"
 
 application: Application = None
+
+
+def _message_body(message: str) -> bytes:
+    # Same encoding as JSONResponse would give the {"message": ...} dict.
+    return json.dumps({"message": message}, separators=(",", ":")).encode()
+
+
+# Health check bodies are fixed, so they are encoded once.
+_STARTUP_SUCCEEDED = _message_body("Startup check succeeded.")
+_READINESS_SUCCEEDED = _message_body("Readiness check succeeded.")
+_READINESS_FAILED = _message_body("Readiness check failed.")
+_LIVENESS_SUCCEEDED = _message_body("Liveness check succeeded.")
+_LIVENESS_FAILED = _message_body("Liveness check failed.")
+
 router = APIRouter(prefix=HEALTH_ROUTE_PREFIX, tags=["Health"])
 
 
@@ -25,26 +40,30 @@ def initialize(app: Application):
 # As soon as we start the server, the endpoints are ready to be read
 @router.get(HEALTH_ROUTE_STARTUP, status_code=status.HTTP_200_OK)
 def startup_check():
-    return {"message": "Startup check succeeded."}
+    return Response(_STARTUP_SUCCEEDED, media_type="application/json")
 
 
 # The server readiness health check is meant to inform
 # whether the server is ready to receive requests or not
 @router.get(HEALTH_ROUTE_READY, status_code=status.HTTP_200_OK)
-def readiness_check(response: Response):
-    message = "Readiness check succeeded."
-    if not application.is_ready():
-        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
-        message = "Readiness check failed."
-    return {"message": message}
+def readiness_check():
+    if application.is_ready():
+        return Response(_READINESS_SUCCEEDED, media_type="application/json")
+    return Response(
+        _READINESS_FAILED,
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        media_type="application/json",
+    )
 
 
 # The server liveness health check is meant to detect unrecoverable errors
 # the server needs restart if unhealthy state is detected
 @router.get(HEALTH_ROUTE_LIVE, status_code=status.HTTP_200_OK)
-def liveness_check(response: Response):
-    message = "Liveness check succeeded."
-    if not application.is_alive():
-        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
-        message = "Liveness check failed."
-    return {"message": message}
+def liveness_check():
+    if application.is_alive():
+        return Response(_LIVENESS_SUCCEEDED, media_type="application/json")
+    return Response(
+        _LIVENESS_FAILED,
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        media_type="application/json",
+    )
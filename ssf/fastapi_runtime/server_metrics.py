@@ -3,15 +3,8 @@ import time
 from typing import Sequence, Union
 
 from fastapi import FastAPI
-from prometheus_client import start_http_server
-from prometheus_fastapi_instrumentator import Instrumentator, metrics
-from starlette.datastructures import MutableHeaders
 
 from ssf.application_interface.runtime_settings import HEADER_METRICS_REQUEST_LATENCY
-from ssf.common_runtime.metrics import (
-    get_ssf_custom_metrics,
-    get_default_custom_metrics,
-)
 from ssf.fastapi_runtime import server_health
 from ssf.utils import API_FASTAPI
 
@@ -22,6 +15,14 @@ def add_prometheus_instrumentator(
     prometheus_endpoint: str,
     prometheus_buckets: Sequence[Union[float, str]],
 ):
+    # Prometheus support is only imported when enabled.
+    from prometheus_client import start_http_server
+    from prometheus_fastapi_instrumentator import Instrumentator
+
+    from ssf.common_runtime.metrics import (
+        get_ssf_custom_metrics,
+        get_default_custom_metrics,
+    )
 
     metrics_endpoint = prometheus_endpoint
     if not metrics_endpoint.startswith("/"):
@@ -45,12 +46,17 @@ def add_prometheus_instrumentator(
     metrics = get_default_custom_metrics(
         prometheus_buckets, API_FASTAPI
     ) + get_ssf_custom_metrics(prometheus_buckets)
-    [instrumentator.add(metric) for metric in metrics]
+    for metric in metrics:
+        instrumentator.add(metric)
 
     if not prometheus_port:
         instrumentator.expose(app, endpoint=metrics_endpoint)
 
 
+# Raw (lower-case, latin-1) header name as sent in ASGI messages.
+_LATENCY_HEADER = HEADER_METRICS_REQUEST_LATENCY.lower().encode("latin-1")
+
+
 class RequestLatencyProviderMiddleware:
     def __init__(self, app):
         self.app = app
@@ -60,14 +66,14 @@ class RequestLatencyProviderMiddleware:
         if scope["type"] != "http":
             return await self.app(scope, receive, send)
 
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         async def send_with_extra_headers(message):
             if message["type"] == "http.response.start":
-                headers = MutableHeaders(scope=message)
-                headers.append(
-                    HEADER_METRICS_REQUEST_LATENCY, str(time.time() - start_time)
-                )
+                latency = str(time.perf_counter() - start_time).encode("latin-1")
+                headers = list(message.get("headers", ()))
+                headers.append((_LATENCY_HEADER, latency))
+                message["headers"] = headers
             await send(message)
 
         await self.app(scope, receive, send_with_extra_headers)
@@ -1,6 +1,7 @@
 # Copyright (c) 2023 Graphcore Ltd. All rights reserved.
 import logging
 import os
+import py_compile
 
 from ssf.utils import get_supported_apis, load_module, get_endpoints_gen_module_path
 from ssf.application_interface.config import SSFConfig
@@ -29,6 +30,12 @@ def generate_endpoints(ssf_config: SSFConfig):
                 get_endpoints_gen_module_path(ssf_config.args.api), "generate_endpoints"
             )
             generate_module.generate(ssf_config, idx, endpoint_file)
+            # Compile at build time to the standard __pycache__ location so
+            # server start (and each replica) loads the cached bytecode.
+            try:
+                py_compile.compile(endpoint_file, doraise=True)
+            except py_compile.PyCompileError as e:
+                logger.warning(f"Failed to pre-compile {endpoint_file}: {e.msg}")
         else:
             if os.path.exists(get_endpoints_gen_module_path(ssf_config.args.api)):
                 logger.debug(
@@ -14,7 +14,6 @@ from ssf.common_runtime.callbacks import notify_error_callback
 from ssf.application_interface.runtime_settings import settings
 
 from ssf.common_runtime.dispatcher import Application
-from ssf.results import SSFExceptionArgumentsError
 
 from ssf.utils import API_GRPC, ascii_to_object
 
@@ -184,8 +183,5 @@ class gRPCserver:
         if self.startup_thread.is_alive():
             self.logger.info("Lifespan stop : joining startup thread")
             self.startup_thread.join()
-            self.logger.info("Lifespan stop : stop application")
-            self.application.stop()
-        else:
-            self.logger.info("Lifespan stop : stop application")
-            self.application.stop()
+        self.logger.info("Lifespan stop : stop application")
+        self.application.stop()
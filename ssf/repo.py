@@ -3,7 +3,7 @@
 import logging
 import os
 import shutil
-import tempfile
+import io
 
 from ssf.application_interface.results import (
     SSFExceptionGitRepoError,
@@ -104,7 +104,7 @@ def paperspace_load_model(repo_dir, model_id: str, args):
             f"Please set Gradient API token using --deploy-paperspace-api-key"
         )
 
-    with tempfile.NamedTemporaryFile(mode="w+t") as gradient_output:
+    with io.StringIO() as gradient_output:
         exit_code = logged_subprocess(
             "Gradient downloading model",
             [
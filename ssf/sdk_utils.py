@@ -5,6 +5,7 @@ import os
 import re
 from shutil import copytree, rmtree
 import logging
+import io
 import tempfile
 import base64
 from packaging import version
@@ -386,7 +387,7 @@ def enable_sdk(env: dict, sdk_root_path: str):
         wrapped_enable_script.write(f"echo '{ENV_HEADER}'\n")
         wrapped_enable_script.write("env -0\n")
         logger.debug("Running wrapped enable script")
-        with tempfile.NamedTemporaryFile(mode="w+t") as log_output:
+        with io.StringIO() as log_output:
             wrapped_enable_script.seek(0)
             exit_code = logged_subprocess(
                 "enable sdk",
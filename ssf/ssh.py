@@ -2,6 +2,7 @@
 
 import logging
 import os
+from typing import List
 
 from ssf.application_interface.results import SSFExceptionSshError
 
@@ -9,6 +10,18 @@ from ssf.utils import logged_subprocess
 
 logger = logging.getLogger()
 
+# Share one SSH connection per target between ssh calls running at the same time,
+# so they skip the TCP connection and key exchange. The connection is not kept
+# after the ssh call that opened it exits.
+# %C is a hash of the connection parameters: it keeps the control socket path
+# short whatever the user and host names are.
+SSH_CONNECTION_SHARING_OPTIONS = [
+    "-o",
+    "ControlMaster=auto",
+    "-o",
+    "ControlPath=~/.ssh/cm-%C",
+]
+
 
 def check_init_ssh():
     ssh_dir = os.path.expanduser("~/.ssh")
@@ -60,6 +73,12 @@ def add_ssh_host(host: str):
                 )
 
 
+def ssh_command(target: str) -> List[str]:
+    """Returns the ssh command line prefix for running commands at target."""
+    check_init_ssh()
+    return ["ssh"] + SSH_CONNECTION_SHARING_OPTIONS + [target]
+
+
 def clear_ssh_keys():
     args = ["ssh-add", "-D"]
     logger.info(f"Clear all keys")
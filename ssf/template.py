@@ -1,8 +1,10 @@
 # Copyright (c) 2023 Graphcore Ltd. All rights reserved.
 from abc import ABC, abstractmethod
 from datetime import datetime
+from functools import lru_cache
 import logging
-from typing import Any, List
+import os
+from typing import Any, List, Tuple
 
 
 logger = logging.getLogger("ssf")
@@ -55,59 +57,83 @@ class AutogeneratedSymbolParser(TemplateSymbolParser):
         return None
 
 
+@lru_cache(maxsize=32)
+def _read_template(template_filename: str, mtime_ns: int) -> Tuple[str, ...]:
+    with open(template_filename, "rt") as template:
+        return tuple(template)
+
+
+def load_template(template_filename: str) -> Tuple[str, ...]:
+    # Templates are read once, then expanded as many times as needed
+    # (e.g. once per endpoint); a template modified on disk is read again.
+    return _read_template(template_filename, os.stat(template_filename).st_mtime_ns)
+
+
 def expand_template(
     ssf_config: SSFConfig,
     template_filename: str,
     expanded_filename: str,
     custom_parsers: List[TemplateSymbolParser] = [],
 ):
-    with open(template_filename, "rt") as template:
-        with open(expanded_filename, "wt") as output:
+    template = load_template(template_filename)
+
+    parsers = []
+
+    # Add built-in/common parsers
+    parsers.append(AutogeneratedSymbolParser())
+    parsers.append(ConfigSymbolParser(ssf_config))
+
+    # Add caller's custom parsers
+    if custom_parsers:
+        parsers += custom_parsers
+
+    # Symbols are expanded once per (symbol, indent), repeated symbols
+    # (e.g. {{config.application.name}}) reuse the first expansion.
+    expansions = {}
+
+    # The file is written in one go once fully expanded, so a failed expansion
+    # does not leave a partial file behind.
+    expanded = []
+
+    for line in template:
+
+        # Parse symbols.
+        while True:
+            sym_begin = line.find("{{")
+            if sym_begin < 0:
+                break
+            sym_end = sym_begin + 2 + line[sym_begin + 2 :].find("}}") + 1
+            if sym_end < 0:
+                raise SSFExceptionInternalError(
+                    f"Failed to find closing brackets for symbol beginning at position {sym_begin} in {template_filename}, line {line}"
+                )
+            symbol = line[sym_begin + 2 : sym_end - 1]
+            indent = len(line) - len(line.lstrip())
+
+            insert_lines = expansions.get((symbol, indent))
+            if insert_lines is None:
+                logger.debug(f"Parsing {symbol}")
+
+                for parser in parsers:
+                    insert_lines = parser.parse(symbol, indent)
+                    if insert_lines is not None:
+                        break
 
-            parsers = []
+                if insert_lines is None:
+                    raise SSFExceptionInternalError(
+                        f"Failed to replace template symbol {symbol} at position {sym_begin} in {template_filename}, line {line}"
+                    )
 
-            # Add built-in/common parsers
-            parsers.append(AutogeneratedSymbolParser())
-            parsers.append(ConfigSymbolParser(ssf_config))
+                logger.debug(f"insert_lines={insert_lines}")
+                expansions[(symbol, indent)] = insert_lines
 
-            # Add caller's custom parsers
-            if custom_parsers:
-                parsers += custom_parsers
+            new_line = line[0:sym_begin] + insert_lines + line[sym_end + 1 :]
+            line = new_line
 
-            for line in template:
+        if len(line.strip()) == 0:
+            expanded.append("\n")
+        else:
+            expanded.append(line)
 
-                # Parse symbols.
-                while True:
-                    sym_begin = line.find("{{")
-                    if sym_begin < 0:
-                        break
-                    sym_end = sym_begin + 2 + line[sym_begin + 2 :].find("}}") + 1
-                    if sym_end < 0:
-                        raise SSFExceptionInternalError(
-                            f"Failed to find closing brackets for symbol beginning at position {sym_begin} in {template_filename}, line {line}"
-                        )
-                    symbol = line[sym_begin + 2 : sym_end - 1]
-                    indent = len(line) - len(line.lstrip())
-
-                    logger.debug(f"Parsing {symbol}")
-
-                    insert_lines = None
-                    for parser in parsers:
-                        insert_lines = parser.parse(symbol, indent)
-                        if insert_lines is not None:
-                            break
-
-                    if insert_lines is None:
-                        raise SSFExceptionInternalError(
-                            f"Failed to replace template symbol {symbol} at position {sym_begin} in {template_filename}, line {line}"
-                        )
-
-                    logger.debug(f"insert_lines={insert_lines}")
-
-                    new_line = line[0:sym_begin] + insert_lines + line[sym_end + 1 :]
-                    line = new_line
-
-                if len(line.strip()) == 0:
-                    output.write("\n")
-                else:
-                    output.write(line)
+    with open(expanded_filename, "wt") as output:
+        output.write("".join(expanded))
@@ -74,16 +74,20 @@ def test(ssf_config: SSFConfig):
     IPADDR = f"{HOST}:{PORT}"
 
     def subtest_check_server_ready(session, startup_timeout):
-        WAIT_PERIOD = 20
+        # Poll with an exponential backoff (from MIN_WAIT_PERIOD up to WAIT_PERIOD)
+        # so fast-starting servers are detected quickly.
+        MIN_WAIT_PERIOD = 0.1
+        WAIT_PERIOD = 5
         INFO_PERIOD = 120
 
-        start = time.time()
+        start = time.monotonic()
+        deadline = start + startup_timeout
         last_info = start
+        wait = MIN_WAIT_PERIOD
 
         MAGIC1 = 200
 
         logger.info(f"Waiting for server ready (timeout {startup_timeout}s)")
-        time.sleep(WAIT_PERIOD / 4)
 
         while True:
 
@@ -100,22 +104,21 @@ def test(ssf_config: SSFConfig):
             except:
                 pass
 
-            time.sleep(WAIT_PERIOD)
-
-            now = time.time()
-            elapsed = now - start
-
-            if elapsed > startup_timeout:
+            now = time.monotonic()
+            if now >= deadline:
                 logger.error("Timeout waiting for server ready")
                 return False
 
             if (now - last_info) > INFO_PERIOD:
                 if logger:
                     logger.info(
-                        f"Still waiting for server ready ({int(elapsed)}/{startup_timeout}s)"
+                        f"Still waiting for server ready ({int(now - start)}/{startup_timeout}s)"
                     )
                 last_info = now
 
+            time.sleep(min(wait, deadline - now))
+            wait = min(wait * 1.5, WAIT_PERIOD)
+
     def subtest_check_root_endpoint(session) -> bool:
         MAGIC1 = 200
         MAGIC2 = '{"message":"OK"}'
@@ -7,7 +7,7 @@ import logging
 import os
 import subprocess
 import sys
-import tempfile
+import io
 import multiprocessing as mp
 import pickle
 import base64
@@ -218,10 +218,13 @@ def logged_subprocess(
     stdout_log_level=logging.DEBUG,
     stderr_log_level=logging.DEBUG,
     environ=None,
+    close_fds=True,
 ) -> int:
     # NOTES:
     # Option: Specifiy file_output to copy output to file in addition to logger
     # Option: Specify pipe_input to pass input to process
+    # Option: Specify close_fds=False (with an absolute command path) to let
+    #         subprocess use posix_spawn rather than fork/exec
     # Logging errors as debug by default because many external apps (e.g. git)
     # write non-errors to stderr which generates bogus red-ink ERROR lines in
     # the log. The exit result must be used to trap real errors.
@@ -238,6 +241,7 @@ def logged_subprocess(
         stderr=subprocess.PIPE,
         stdin=subprocess.PIPE,
         env=os.environ.copy() if environ is None else environ,
+        close_fds=close_fds,
     )
     logger.debug(f"Created process {process.pid} for [{tag}]")
 
@@ -290,6 +294,15 @@ def logged_subprocess(
     return result
 
 
+def write_file_atomic(filename: str, content: str):
+    """Write content to filename with a single write, replacing any existing
+    file atomically so readers never see a partially written file."""
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, "w") as f:
+        f.write(content)
+    os.replace(tmp_filename, filename)
+
+
 def install_python_packages(
     python_packages: str, executable: str = sys.executable
 ) -> int:
@@ -399,7 +412,7 @@ def build_file_list(
 
 
 def get_default_ipaddr():
-    with tempfile.TemporaryFile(mode="w+t") as capture:
+    with io.StringIO() as capture:
         exit_code = logged_subprocess(
             f"Get IP", ["ip", "route", "show"], file_output=capture
         )
@@ -0,0 +1,99 @@
+# Copyright (c) 2023 Graphcore Ltd. All rights reserved.
+import queue
+import threading
+import types
+
+import pytest
+
+from ssf.application_interface.runtime_settings import WORKER_READY, WORKER_SUCCESS
+from ssf.common_runtime.dispatcher import Dispatcher
+
+
+def make_dispatcher(replicas: int = 2) -> Dispatcher:
+    # Only what the request/result path needs, without starting workers
+    # or the global manager.
+    input_queue = queue.Queue()
+    output_queue = queue.Queue()
+    dispatcher = Dispatcher.__new__(Dispatcher)
+    dispatcher.application_id = "stub"
+    dispatcher.namespace = "stub.0"
+    dispatcher.manager = types.SimpleNamespace(
+        input_queue=lambda namespace: input_queue,
+        output_queue=lambda namespace: output_queue,
+    )
+    dispatcher.process_failure_counts = [0] * replicas
+    dispatcher.state_changed = threading.Event()
+    dispatcher.pending = {}
+    dispatcher.pending_lock = threading.Lock()
+    dispatcher.results_thread = threading.Thread(
+        target=dispatcher.route_results, daemon=True
+    )
+    dispatcher.results_thread.start()
+    return dispatcher
+
+
+@pytest.mark.fast
+def test_dispatcher_route_results():
+    dispatcher = make_dispatcher()
+    results = {}
+
+    def request(n: int):
+        dispatcher.queue_request({"n": n})
+        results[n] = dispatcher.get_result()
+
+    threads = [threading.Thread(target=request, args=(n,)) for n in range(4)]
+    [t.start() for t in threads]
+
+    # Echo each request back to the thread that queued it, in reverse order.
+    requests = [dispatcher.input_queue.get(timeout=10) for _ in threads]
+    for thread_id, data in reversed(requests):
+        dispatcher.output_queue.put((thread_id, {"n": data["n"]}))
+    [t.join(10) for t in threads]
+
+    assert results == {n: {"n": n} for n in range(4)}
+    assert dispatcher.pending == {}
+
+    dispatcher.output_queue.put((WORKER_READY, 0))
+    assert dispatcher.state_changed.wait(10)
+
+    dispatcher.process_failure_counts[:] = [3, 3]
+    dispatcher.output_queue.put((WORKER_SUCCESS, 1))
+
+    # None stops the results thread (after the queued success report).
+    dispatcher.output_queue.put(None)
+    dispatcher.results_thread.join(10)
+    assert not dispatcher.results_thread.is_alive()
+    assert dispatcher.process_failure_counts == [3, 0]
+
+
+class FakeProcess:
+    def __init__(self, exitcode):
+        self.pid = 1234
+        self.exitcode = exitcode
+
+    def is_alive(self):
+        return self.exitcode is None
+
+    def close(self):
+        pass
+
+
+@pytest.mark.fast
+def test_dispatcher_clean_counts_failures():
+    dispatcher = make_dispatcher(replicas=4)
+    # Running, application error, killed by SIGKILL, clean exit.
+    dispatcher.processes = [
+        FakeProcess(None),
+        FakeProcess(1),
+        FakeProcess(-9),
+        FakeProcess(0),
+    ]
+    assert dispatcher.clean()
+    assert dispatcher.process_failure_counts == [0, 1, 1, 0]
+    assert [p is not None for p in dispatcher.processes] == [
+        True,
+        False,
+        False,
+        False,
+    ]
+    dispatcher.output_queue.put(None)
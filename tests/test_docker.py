@@ -0,0 +1,228 @@
+# Copyright (c) 2023 Graphcore Ltd. All rights reserved.
+import io
+import json
+import pytest
+import sys
+
+from ssf import docker
+
+
+class FakeResponse(io.BytesIO):
+    def __init__(self, status: int, body: bytes = b""):
+        super().__init__(body)
+        self.status = status
+
+
+def fake_json_response(obj, status: int = 200) -> FakeResponse:
+    return FakeResponse(status, json.dumps(obj).encode())
+
+
+@pytest.fixture
+def fake_engine(monkeypatch):
+    """Replaces the Docker Engine socket connection with a fake.
+
+    Each request made (by any connection) takes the next entry of `script`:
+    a FakeResponse to return or an exception to raise.
+    """
+
+    class FakeConnection:
+        script = []
+        instances = []
+
+        def __init__(self, socket_path: str):
+            self.urls = []
+            self.closed = False
+            FakeConnection.instances.append(self)
+
+        def request(self, method: str, url: str):
+            self.urls.append(url)
+            action = FakeConnection.script.pop(0)
+            if isinstance(action, BaseException):
+                raise action
+            self.response = action
+
+        def getresponse(self):
+            return self.response
+
+        def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(docker, "_DockerSocketConnection", FakeConnection)
+    monkeypatch.setattr(docker, "_engine_connection", None)
+    return FakeConnection
+
+
+@pytest.mark.fast
+def test_engine_inspect(fake_engine):
+    fake_engine.script = [
+        fake_json_response({"State": {"Running": True}}),
+        fake_json_response({"State": {"Running": False}}),
+    ]
+    assert docker._engine_inspect("my/app") == {"State": {"Running": True}}
+    assert docker._engine_inspect("my/app") == {"State": {"Running": False}}
+
+    # The connection is kept alive and reused, the name is quoted.
+    assert len(fake_engine.instances) == 1
+    assert fake_engine.instances[0].urls == ["/containers/my%2Fapp/json"] * 2
+
+
+@pytest.mark.fast
+def test_engine_inspect_not_found(fake_engine):
+    fake_engine.script = [FakeResponse(404, b'{"message": "No such container"}')]
+    assert docker._engine_inspect("app") is None
+
+
+@pytest.mark.fast
+def test_engine_inspect_dropped_connection(fake_engine):
+    fake_engine.script = [
+        ConnectionResetError("dropped"),
+        fake_json_response({"State": {"Running": True}}),
+    ]
+    with pytest.raises(OSError):
+        docker._engine_inspect("app")
+    # The broken connection is closed and reset...
+    assert docker._engine_connection is None
+    assert fake_engine.instances[0].closed
+
+    # ...and a new one is opened by the next call.
+    assert docker._engine_inspect("app") == {"State": {"Running": True}}
+    assert len(fake_engine.instances) == 2
+    assert docker._engine_connection is fake_engine.instances[1]
+
+
+@pytest.mark.fast
+def test_inspect_state_falls_back_to_cli(fake_engine, monkeypatch):
+    commands = []
+
+    def fake_docker_command(label, args, file_output=None, **kwargs):
+        commands.append(args)
+        file_output.write('{"Status": "running", "Running": true}\n')
+        return None
+
+    monkeypatch.setattr(docker, "_engine_available", lambda: True)
+    monkeypatch.setattr(docker, "logged_docker_command", fake_docker_command)
+    fake_engine.script = [FakeResponse(500, b"server error")]
+
+    state = docker.inspect_state("app")
+    assert state == {"Status": "running", "Running": True}
+    assert len(commands) == 1
+    assert commands[0][:3] == ["docker", "container", "inspect"]
+    assert commands[0][-1] == "app"
+
+
+def log_frame(stream: int, data: bytes) -> bytes:
+    # Multiplexed log frame: stream type, 3 bytes padding, 4 bytes big-endian size.
+    return bytes([stream, 0, 0, 0]) + len(data).to_bytes(4, "big") + data
+
+
+@pytest.mark.fast
+def test_engine_follow_logs_multiplexed(fake_engine):
+    stream = (
+        log_frame(1, b"hel")
+        + log_frame(2, b"lo\nwor")
+        + log_frame(1, b"")
+        + log_frame(1, b"ld\nUvicorn running")
+    )
+    fake_engine.script = [
+        fake_json_response({"Config": {"Tty": False}}),
+        FakeResponse(200, stream),
+    ]
+    lines, close = docker._engine_follow_logs("app")
+    # Lines spanning frames are joined, the trailing partial line is kept.
+    assert list(lines) == ["hello\n", "world\n", "Uvicorn running"]
+
+    logs_connection = fake_engine.instances[-1]
+    assert logs_connection is not docker._engine_connection
+    assert logs_connection.urls == [
+        "/containers/app/logs?follow=1&stdout=1&stderr=1"
+    ]
+    assert logs_connection.closed
+    close()
+
+
+@pytest.mark.fast
+def test_engine_follow_logs_tty(fake_engine):
+    fake_engine.script = [
+        fake_json_response({"Config": {"Tty": True}}),
+        FakeResponse(200, b"hello\nworld\nUvicorn running"),
+    ]
+    lines, close = docker._engine_follow_logs("app")
+    assert list(lines) == ["hello\n", "world\n", "Uvicorn running"]
+    assert fake_engine.instances[-1].closed
+    close()
+
+
+@pytest.mark.fast
+def test_engine_follow_logs_not_found(fake_engine):
+    fake_engine.script = [FakeResponse(404)]
+    with pytest.raises(docker.http.client.HTTPException):
+        docker._engine_follow_logs("app")
+
+
+@pytest.mark.fast
+def test_spawn_args_uses_environ_path(tmp_path, monkeypatch):
+    executable = tmp_path / "gc-docker"
+    executable.write_text("#!/bin/sh\n")
+    executable.chmod(0o755)
+    monkeypatch.setattr(docker, "_executables", {})
+
+    environ = {"PATH": str(tmp_path)}
+    assert docker._spawn_args(["gc-docker", "ps"], environ) == [str(executable), "ps"]
+    # Not found on the default PATH: left for subprocess to resolve.
+    monkeypatch.setenv("PATH", "/nonexistent")
+    assert docker._spawn_args(["gc-docker", "ps"]) == ["gc-docker", "ps"]
+
+
+@pytest.mark.fast
+def test_inspect_state_not_found_falls_back_to_cli(fake_engine, monkeypatch):
+    commands = []
+
+    def fake_docker_command(label, args, file_output=None, **kwargs):
+        commands.append(args)
+        file_output.write('{"Status": "running", "Running": true}\n')
+        return None
+
+    monkeypatch.setattr(docker, "_engine_available", lambda: True)
+    monkeypatch.setattr(docker, "logged_docker_command", fake_docker_command)
+    fake_engine.script = [FakeResponse(404, b'{"message": "No such container"}')]
+
+    # The engine's daemon may not be the CLI's one so a 404 isn't final.
+    state = docker.inspect_state("app")
+    assert state == {"Status": "running", "Running": True}
+    assert len(commands) == 1
+    assert commands[0][:3] == ["docker", "container", "inspect"]
+
+
+@pytest.mark.fast
+def test_engine_available_docker_context(tmp_path, monkeypatch):
+    monkeypatch.setattr(docker.os.path, "exists", lambda path: True)
+    monkeypatch.delenv("DOCKER_HOST", raising=False)
+    monkeypatch.delenv("DOCKER_CONTEXT", raising=False)
+    monkeypatch.setenv("DOCKER_CONFIG", str(tmp_path))
+    assert docker._engine_available()
+
+    (tmp_path / "config.json").write_text('{"currentContext": "default"}')
+    assert docker._engine_available()
+
+    (tmp_path / "config.json").write_text('{"currentContext": "rootless"}')
+    assert not docker._engine_available()
+
+    (tmp_path / "config.json").write_text("{}")
+    monkeypatch.setenv("DOCKER_CONTEXT", "remote")
+    assert not docker._engine_available()
+
+    monkeypatch.delenv("DOCKER_CONTEXT")
+    monkeypatch.setenv("DOCKER_HOST", "tcp://remote:2375")
+    assert not docker._engine_available()
+
+
+@pytest.mark.fast
+def test_wait_ready_from_logs_cli_undecodable_bytes(monkeypatch):
+    # The CLI fallback must not stop at log lines that aren't valid UTF-8.
+    script = "import sys; sys.stdout.buffer.write(b'\\xff\\xfe progress\\nUvicorn running\\n')"
+    monkeypatch.setattr(docker, "is_running", lambda application_id: True)
+    monkeypatch.setattr(docker, "_engine_available", lambda: False)
+    monkeypatch.setattr(
+        docker, "_spawn_args", lambda args, environ=None: [sys.executable, "-c", script]
+    )
+    assert docker.wait_ready_from_logs("app", "Uvicorn running", timeout=30)
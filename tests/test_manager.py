@@ -0,0 +1,50 @@
+# Copyright (c) 2023 Graphcore Ltd. All rights reserved.
+import pytest
+
+from ssf.common_runtime.manager import get_global_manager
+
+
+@pytest.mark.fast
+def test_global_manager_namespaces():
+    manager = get_global_manager()
+    assert get_global_manager() is manager
+
+    ns_a = "test_manager.a"
+    ns_b = "test_manager.b"
+
+    # Queues are separate per namespace.
+    manager.input_queue(ns_a).put("a")
+    manager.input_queue(ns_b).put("b")
+    manager.output_queue(ns_a).put("out_a")
+    assert manager.input_queue(ns_a).get(timeout=5) == "a"
+    assert manager.input_queue(ns_b).get(timeout=5) == "b"
+    assert manager.output_queue(ns_a).get(timeout=5) == "out_a"
+    assert manager.output_queue(ns_b).empty()
+
+    # Config is separate per namespace.
+    manager.config(ns_a).update({"value": 1})
+    assert manager.config(ns_a).copy() == {"value": 1}
+    assert manager.config(ns_b).copy() == {}
+
+    # Ready events are separate per namespace and per replica index.
+    manager.ready(ns_a, 0).set()
+    assert manager.ready(ns_a, 0).is_set()
+    assert not manager.ready(ns_a, 1).is_set()
+    assert not manager.ready(ns_b, 0).is_set()
+
+    manager.terminate(ns_a).set()
+    assert not manager.terminate(ns_b).is_set()
+
+    # Releasing a namespace drops its resources (they are re-created empty on
+    # next access) and leaves other namespaces untouched.
+    manager.input_queue(ns_a).put("stale")
+    manager.config(ns_b).update({"value": 2})
+    manager.release(ns_a)
+    assert manager.input_queue(ns_a).empty()
+    assert manager.config(ns_a).copy() == {}
+    assert not manager.ready(ns_a, 0).is_set()
+    assert not manager.terminate(ns_a).is_set()
+    assert manager.config(ns_b).copy() == {"value": 2}
+
+    manager.release(ns_a)
+    manager.release(ns_b)
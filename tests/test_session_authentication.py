@@ -2,7 +2,13 @@
 import pytest
 import requests
 import os
+import types
 import utils
+from collections import OrderedDict
+
+from fastapi import HTTPException
+
+from ssf.fastapi_runtime import server_authentication
 
 
 class SessionAuthenticationTest(utils.TestClient):
@@ -152,3 +158,66 @@ class TestsAuthenticationCustom(SessionAuthenticationTest):
         assert self.TestStatus(expected_user_id="freddy")
         assert self.TestLogout()
         assert self.TestEndpoint(expected_status_code=403)
+
+
+@pytest.fixture
+def session_clock(monkeypatch):
+    # Empty session tables, a fixed timeout and a clock the test can advance.
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(server_authentication, "sessions", OrderedDict())
+    monkeypatch.setattr(server_authentication, "user_sessions", {})
+    monkeypatch.setattr(
+        server_authentication,
+        "time",
+        types.SimpleNamespace(monotonic=lambda: clock.now),
+    )
+    monkeypatch.setattr(
+        server_authentication.settings, "session_authentication_timeout", 10
+    )
+    return clock
+
+
+def assert_invalid_session(session_key):
+    with pytest.raises(HTTPException) as e:
+        server_authentication.get_user_id_from_session(session_key)
+    assert e.value.status_code == 401
+
+
+@pytest.mark.fast
+def test_session_expired(session_clock):
+    session_key = server_authentication.create_session_for_user("1")
+    assert server_authentication.get_user_id_from_session(session_key) == "1"
+
+    session_clock.now += 11
+    assert_invalid_session(session_key)
+
+    # Expired sessions are dropped when the next session is created.
+    server_authentication.create_session_for_user("2")
+    assert "1" not in server_authentication.user_sessions
+    assert len(server_authentication.sessions) == 1
+
+
+@pytest.mark.fast
+def test_session_eviction_oldest_first(session_clock, monkeypatch):
+    monkeypatch.setattr(server_authentication, "SESSION_MAX_PER_USER", 2)
+    other_key = server_authentication.create_session_for_user("2")
+    keys = [server_authentication.create_session_for_user("1") for _ in range(3)]
+
+    # Only the user's oldest session is dropped, other users are unaffected.
+    assert_invalid_session(keys[0])
+    for session_key in keys[1:]:
+        assert server_authentication.get_user_id_from_session(session_key) == "1"
+    assert server_authentication.get_user_id_from_session(other_key) == "2"
+
+
+@pytest.mark.fast
+def test_session_logout_removes_hashed_entry(session_clock):
+    session_key = server_authentication.create_session_for_user("1")
+    key_hash = server_authentication._session_hash(session_key)
+    assert key_hash in server_authentication.sessions
+    assert session_key not in server_authentication.sessions
+
+    server_authentication.delete_session(session_key)
+    assert key_hash not in server_authentication.sessions
+    assert "1" not in server_authentication.user_sessions
+    assert_invalid_session(session_key)
@@ -0,0 +1,19 @@
+# Copyright (c) 2023 Graphcore Ltd. All rights reserved.
+import os
+import pytest
+
+from ssf.template import load_template
+
+
+@pytest.mark.fast
+def test_load_template_reloads_modified(tmp_path):
+    template_file = tmp_path / "test.template"
+    template_file.write_text("a\nb\n")
+    assert load_template(str(template_file)) == ("a\n", "b\n")
+    assert load_template(str(template_file)) is load_template(str(template_file))
+
+    template_file.write_text("c\n")
+    # Force a different mtime in case the filesystem timestamp is coarse.
+    mtime_ns = os.stat(template_file).st_mtime_ns + 1_000_000_000
+    os.utime(template_file, ns=(mtime_ns, mtime_ns))
+    assert load_template(str(template_file)) == ("c\n",)
@@ -0,0 +1,167 @@
+# Copyright (c) 2023 Graphcore Ltd. All rights reserved.
+import queue
+import sys
+import threading
+import types
+
+import pytest
+
+from ssf.application_interface import worker
+from ssf.application_interface.results import RESULT_OK
+from ssf.application_interface.runtime_settings import WORKER_READY, WORKER_SUCCESS
+
+
+class StubApplication:
+    def __init__(self):
+        self.requests = []
+        self.shutdown_called = False
+
+    def startup(self):
+        return RESULT_OK
+
+    def request(self, params, meta):
+        self.requests.append(params)
+        if isinstance(params, list):
+            return [{"y": p["x"] * 2} for p in params]
+        return {"y": params["x"] * 2}
+
+    def watchdog(self):
+        return RESULT_OK
+
+    def shutdown(self):
+        self.shutdown_called = True
+
+
+class WorkerHarness:
+    """Runs worker.process_loop in a thread with in-process queues and events"""
+
+    def __init__(self, app_dir: str, max_batch_size: int = 1):
+        self.input_queue = queue.Queue()
+        self.output_queue = queue.Queue()
+        self.ready = threading.Event()
+        self.terminate = threading.Event()
+        self.exit_code = None
+        self.ssf_config = types.SimpleNamespace(
+            application=types.SimpleNamespace(
+                id="stub",
+                dir=app_dir,
+                file_dir=app_dir,
+                syspaths=None,
+                max_batch_size=max_batch_size,
+            )
+        )
+        self.settings = types.SimpleNamespace(
+            batching_timeout=0.2,
+            watchdog_ready_period=0,
+            watchdog_request_average=3,
+            watchdog_request_threshold=0,
+        )
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        try:
+            worker.process_loop(
+                ssf_config=self.ssf_config,
+                settings=self.settings,
+                parent_pid=0,
+                input_queue=self.input_queue,
+                output_queue=self.output_queue,
+                ready=self.ready,
+                terminate=self.terminate,
+                log_queue=None,
+                index=0,
+            )
+        except SystemExit as e:
+            self.exit_code = e.code
+
+    def request(self, thread_id: int, x: int):
+        self.input_queue.put([thread_id, ({"x": x}, {})])
+
+    def stop(self):
+        # As Dispatcher.stop(): set terminate then wake up the replica.
+        self.terminate.set()
+        self.input_queue.put(None)
+        self.thread.join(10)
+        assert not self.thread.is_alive()
+
+    def outputs(self, count: int):
+        return [self.output_queue.get(timeout=10) for _ in range(count)]
+
+
+@pytest.fixture
+def harness(tmp_path, monkeypatch):
+    app = StubApplication()
+    monkeypatch.setattr(worker, "get_application", lambda ssf_config: app)
+    monkeypatch.setattr(worker, "configure_log_queue", lambda log_queue: None)
+    # signal handlers can only be installed from the main thread.
+    monkeypatch.setattr(worker.signal, "signal", lambda *args: None)
+    monkeypatch.setattr(sys, "path", list(sys.path))
+
+    def make(max_batch_size: int = 1) -> WorkerHarness:
+        h = WorkerHarness(str(tmp_path), max_batch_size)
+        h.app = app
+        return h
+
+    return make
+
+
+def replies(outputs):
+    return {
+        thread_id: result["y"]
+        for thread_id, result in outputs
+        if thread_id not in (WORKER_READY, WORKER_SUCCESS)
+    }
+
+
+@pytest.mark.fast
+def test_worker_unbatched(harness):
+    h = harness()
+    for thread_id, x in [(101, 1), (102, 2), (103, 3)]:
+        h.request(thread_id, x)
+    h.thread.start()
+
+    # Ready, three replies and a single success report.
+    outputs = h.outputs(5)
+    assert outputs[0] == (WORKER_READY, 0)
+    assert outputs.count((WORKER_SUCCESS, 0)) == 1
+    assert replies(outputs) == {101: 2, 102: 4, 103: 6}
+    assert h.ready.is_set()
+    assert h.app.requests == [{"x": 1}, {"x": 2}, {"x": 3}]
+
+    h.stop()
+    assert h.exit_code == 0
+    assert h.output_queue.empty()
+    assert not h.ready.is_set()
+    assert h.app.shutdown_called
+
+
+@pytest.mark.fast
+def test_worker_batched(harness):
+    h = harness(max_batch_size=2)
+    for thread_id, x in [(101, 1), (102, 2), (103, 3)]:
+        h.request(thread_id, x)
+    h.thread.start()
+
+    outputs = h.outputs(5)
+    assert outputs[0] == (WORKER_READY, 0)
+    assert outputs.count((WORKER_SUCCESS, 0)) == 1
+    assert replies(outputs) == {101: 2, 102: 4, 103: 6}
+    # Already queued requests are batched, the last one after the batching timeout.
+    assert h.app.requests == [[{"x": 1}, {"x": 2}], [{"x": 3}]]
+
+    h.stop()
+    assert h.exit_code == 0
+    assert h.output_queue.empty()
+
+
+@pytest.mark.fast
+def test_worker_wake_up_on_stop(harness):
+    h = harness()
+    h.thread.start()
+    assert h.outputs(1) == [(WORKER_READY, 0)]
+
+    # The worker is blocked waiting for a request, the None wake-up ends it.
+    h.stop()
+    assert h.exit_code == 0
+    assert h.app.requests == []
+    assert h.output_queue.empty()